@@ -6,8 +6,13 @@ Basic FastAPI application with simple admin authentication
 
 import os
 import sys
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import logging.handlers
+import queue
+import tempfile
+import threading
+from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 
@@ -15,28 +20,43 @@ from typing import Optional, List, Dict, Any
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from fastapi import FastAPI, Request, HTTPException, Depends, Form, File, UploadFile, Cookie, Response
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi import FastAPI, Request, HTTPException, Depends, Form, File, UploadFile, Cookie, Response, Query
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func, case, select
 from sqlalchemy.orm import Session
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+from jinja2 import FileSystemBytecodeCache
 import uvicorn
 
 # Import application modules
-from app.models.database import get_db, init_database
+from config.config import settings
+from app.models.database import get_db, init_database, DATABASE_URL
 from app.models.models import Order, User, Payment, Feedback
 from app.services.auth import auth_service, get_current_admin
 
 # Configure logging
+# Handlers only enqueue records; a listener thread does the actual file/stdout I/O
+_log_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+_log_file_handler = logging.handlers.RotatingFileHandler(
+    "logs/app.log", maxBytes=50_000_000, backupCount=5
+)
+_log_stream_handler = logging.StreamHandler(sys.stdout)
+for _handler in (_log_file_handler, _log_stream_handler):
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(
+    _log_queue, _log_file_handler, _log_stream_handler, respect_handler_level=True
+)
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-    handlers=[
-        logging.FileHandler("logs/app.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+log_listener.start()
 logger = logging.getLogger("student-services")
 
 # Initialize FastAPI app
@@ -45,47 +65,75 @@ app = FastAPI(
     description="Academic writing services platform with admin panel",
     version="2.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
+# Explicit origins let browsers cache preflight responses (max_age)
+cors_origins = [
+    origin.strip() for origin in settings.cors_origins.split(",") if origin.strip()
+] or [settings.app_url]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=cors_origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    max_age=86400,
 )
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# nginx serves /static/ directly in production; this covers direct hits on :8000
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with browser caching; assets are not fingerprinted, so keep it to a day
+    """
+    
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("Cache-Control", "public, max-age=86400")
+        return response
+
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # Initialize templates
 templates = Jinja2Templates(directory="templates")
 
+# Keep compiled template bytecode across restarts; skip mtime checks outside debug
+_jinja_cache_dir = os.path.join(tempfile.gettempdir(), "jinja_cache")
+os.makedirs(_jinja_cache_dir, exist_ok=True)
+templates.env.bytecode_cache = FileSystemBytecodeCache(_jinja_cache_dir)
+templates.env.auto_reload = settings.debug
+
 # Basic security middleware
-@app.middleware("http")
-async def security_middleware(request: Request, call_next):
+class SecurityHeadersMiddleware:
     """
-    Basic security middleware
+    Pure ASGI middleware adding basic security headers to every response
     """
-    response = await call_next(request)
     
-    # Basic security headers
-    response.headers["X-Frame-Options"] = "SAMEORIGIN"
-    response.headers["X-Content-Type-Options"] = "nosniff"
+    SECURITY_HEADERS = [
+        (b"x-frame-options", b"SAMEORIGIN"),
+        (b"x-content-type-options", b"nosniff"),
+    ]
     
-    return response
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *self.SECURITY_HEADERS]
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
 
-# Session cleanup middleware
-@app.middleware("http")
-async def cleanup_middleware(request: Request, call_next):
-    """
-    Cleanup expired sessions periodically
-    """
-    auth_service.cleanup_expired_sessions()
-    response = await call_next(request)
-    return response
+app.add_middleware(SecurityHeadersMiddleware)
 
 # -------------------------------------------------
 # Authentication Routes
@@ -109,7 +157,7 @@ async def admin_login_page(request: Request, error: Optional[str] = None):
     })
 
 @app.post("/admin/login")
-async def admin_login(
+def admin_login(
     request: Request,
     response: Response,
     username: str = Form(...),
@@ -117,6 +165,9 @@ async def admin_login(
 ):
     """
     Simple admin login endpoint with proper cookie handling
+    
+    Compares the form credentials with the configured admin username/password
+    and creates an in-memory session; declared sync like the other admin routes.
     """
     try:
         # Authenticate user
@@ -169,63 +220,212 @@ async def admin_logout(request: Request):
     
     return response
 
+# -------------------------------------------------
+# Query Helpers
+# -------------------------------------------------
+
+# Per-user order aggregates, valid in queries outer-joining users to orders
+_order_count = func.count(Order.id)
+_total_spent = func.coalesce(
+    func.sum(case((Order.payment_status == 'paid', Order.total_amount), else_=0)),
+    0
+)
+
+def _users_with_order_stats(db: Session):
+    """
+    Query yielding (user, order_count, total_spent) rows in one round trip
+    """
+    return db.query(User, _order_count, _total_spent).outerjoin(
+        Order, Order.user_id == User.id
+    ).group_by(User.id)
+
+def _data_version(db: Session) -> str:
+    """
+    Version string derived from the latest order/user modification times and row counts
+    """
+    latest_order, order_count, latest_user, user_count = db.execute(select(
+        select(func.max(Order.updated_at)).scalar_subquery(),
+        select(func.count(Order.id)).scalar_subquery(),
+        select(func.max(User.updated_at)).scalar_subquery(),
+        select(func.count(User.id)).scalar_subquery()
+    )).one()
+    # Full-precision timestamps so writes within the same second still change the version;
+    # counts catch deletes, which leave max(updated_at) untouched
+    stamps = [ts.isoformat() if ts else "0" for ts in (latest_order, latest_user)]
+    return f"{stamps[0]}-{order_count}-{stamps[1]}-{user_count}"
+
+def _page_cache_headers(admin_user: str, data_version: str) -> Dict[str, str]:
+    """
+    Weak ETag and short private caching for pages rendered from `data_version`
+    """
+    return {"ETag": f'W/"{admin_user}-{data_version}"', "Cache-Control": "private, max-age=10"}
+
+def _paginate(query, page: int, per_page: int):
+    """
+    Return one page of query results together with the total row count
+    """
+    total = query.order_by(None).count()
+    items = query.limit(per_page).offset((page - 1) * per_page).all()
+    return items, total
+
+def _month_bucket(column):
+    """
+    SQL expression truncating a timestamp to a 'YYYY-MM' label
+    """
+    if DATABASE_URL.startswith("sqlite"):
+        return func.strftime('%Y-%m', column)
+    if DATABASE_URL.startswith("mysql"):
+        return func.date_format(column, '%Y-%m')
+    return func.to_char(column, 'YYYY-MM')
+
+def _last_month_labels(count: int) -> List[str]:
+    """
+    'YYYY-MM' labels for the last `count` calendar months, oldest first
+    """
+    now = datetime.now()
+    labels = []
+    for i in range(count - 1, -1, -1):
+        year, month = divmod(now.year * 12 + now.month - 1 - i, 12)
+        labels.append(f"{year:04d}-{month + 1:02d}")
+    return labels
+
+# -------------------------------------------------
+# Cached Aggregates
+# -------------------------------------------------
+
+# Dashboard/analytics aggregates change far slower than admins refresh pages.
+# Entries are keyed on the data version, so a page's ETag never outlives its numbers.
+_stats_cache = TTLCache(maxsize=128, ttl=30)
+_stats_lock = threading.RLock()
+
+@cached(_stats_cache, key=lambda db, data_version: hashkey('dashboard', data_version), lock=_stats_lock)
+def compute_dashboard_stats(db: Session, data_version: str) -> Dict[str, Any]:
+    """
+    Dashboard counters computed in a single pass over orders
+    """
+    total_orders, pending_orders, completed_orders, total_revenue = db.query(
+        func.count(Order.id),
+        func.coalesce(func.sum(case((Order.status == 'pending', 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Order.status == 'completed', 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Order.payment_status == 'paid', Order.total_amount), else_=0)), 0)
+    ).one()
+    total_users = db.query(func.count(User.id)).scalar()
+    
+    return {
+        "total_orders": total_orders,
+        "pending_orders": pending_orders,
+        "completed_orders": completed_orders,
+        "total_users": total_users,
+        "total_revenue": total_revenue
+    }
+
+@cached(_stats_cache, key=lambda db, data_version: hashkey('analytics', data_version), lock=_stats_lock)
+def compute_analytics(db: Session, data_version: str):
+    """
+    Analytics headline figures and monthly revenue for the last year
+    """
+    # Headline figures in a single aggregate query
+    paid_amount = case((Order.payment_status == 'paid', Order.total_amount), else_=None)
+    total_orders, total_revenue, avg_order_value = db.query(
+        func.count(Order.id),
+        func.sum(paid_amount),
+        func.avg(paid_amount)
+    ).one()
+    
+    analytics_data = {
+        'total_orders': total_orders,
+        'total_revenue': total_revenue or 0,
+        'avg_order_value': avg_order_value or 0,
+        'conversion_rate': 0
+    }
+    
+    # Paid revenue for the last 12 calendar months, grouped in SQL
+    months = _last_month_labels(12)
+    first_month = datetime.strptime(months[0], '%Y-%m')
+    month_bucket = _month_bucket(Order.created_at).label('month')
+    
+    rows = db.query(month_bucket, func.sum(Order.total_amount)).filter(
+        Order.payment_status == 'paid',
+        Order.created_at >= first_month
+    ).group_by(month_bucket).all()
+    
+    revenue_by_month = {month: float(revenue or 0) for month, revenue in rows}
+    monthly_revenue = [
+        {'month': month, 'revenue': revenue_by_month.get(month, 0.0)}
+        for month in months
+    ]
+    
+    return analytics_data, monthly_revenue
+
 # -------------------------------------------------
 # Protected Admin Routes
 # -------------------------------------------------
 
 @app.get("/admin", response_class=HTMLResponse)
-async def admin_dashboard(request: Request, admin_session: dict = Depends(get_current_admin)):
+def admin_dashboard(
+    request: Request,
+    admin_session: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
     """
     Admin dashboard - main overview page
     """
     try:
-        db = next(get_db())
+        # Skip all aggregation and rendering if the browser copy is current
+        data_version = _data_version(db)
+        cache_headers = _page_cache_headers(admin_session['username'], data_version)
+        if request.headers.get("if-none-match") == cache_headers["ETag"]:
+            return Response(status_code=304, headers=cache_headers)
         
-        # Get dashboard statistics
-        total_orders = db.query(Order).count()
-        pending_orders = db.query(Order).filter(Order.status == 'pending').count()
-        completed_orders = db.query(Order).filter(Order.status == 'completed').count()
-        total_users = db.query(User).count()
+        # Get dashboard statistics (cached per data version)
+        stats = compute_dashboard_stats(db, data_version)
         
         # Recent orders
         recent_orders = db.query(Order).order_by(Order.created_at.desc()).limit(10).all()
         
-        # Revenue calculation
-        total_revenue = db.query(Order).filter(Order.payment_status == 'paid').with_entities(
-            db.func.sum(Order.total_amount)
-        ).scalar() or 0
-        
-        db.close()
-        
-        return templates.TemplateResponse("admin_dashboard.html", {
+        response = templates.TemplateResponse("admin_dashboard.html", {
             "request": request,
             "admin_user": admin_session['username'],
-            "total_orders": total_orders,
-            "pending_orders": pending_orders,
-            "completed_orders": completed_orders,
-            "total_users": total_users,
-            "total_revenue": total_revenue,
+            **stats,
             "recent_orders": recent_orders
         })
+        response.headers.update(cache_headers)
+        return response
         
     except Exception as e:
         logger.error(f"Error loading admin dashboard: {e}")
         raise HTTPException(status_code=500, detail="Error loading dashboard")
 
 @app.get("/admin/orders", response_class=HTMLResponse)
-async def admin_orders(request: Request, admin_session: dict = Depends(get_current_admin)):
+def admin_orders(
+    request: Request,
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=200),
+    admin_session: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
     """
     Admin orders management page
     """
     try:
-        db = next(get_db())
-        orders = db.query(Order).join(User).order_by(Order.created_at.desc()).all()
-        db.close()
+        orders, total = _paginate(
+            db.query(Order).join(User).order_by(Order.created_at.desc()),
+            page, per_page
+        )
+        
+        # Headline cards cover all orders, not just the current page
+        status_counts = dict(
+            db.query(Order.status, func.count(Order.id)).group_by(Order.status).all()
+        )
         
         return templates.TemplateResponse("admin_orders.html", {
             "request": request,
             "admin_user": admin_session['username'],
-            "orders": orders
+            "orders": orders,
+            "status_counts": status_counts,
+            "total": total,
+            "page": page,
+            "per_page": per_page
         })
         
     except Exception as e:
@@ -233,28 +433,49 @@ async def admin_orders(request: Request, admin_session: dict = Depends(get_curre
         raise HTTPException(status_code=500, detail="Error loading orders")
 
 @app.get("/admin/customers", response_class=HTMLResponse)
-async def admin_customers(request: Request, admin_session: dict = Depends(get_current_admin)):
+def admin_customers(
+    request: Request,
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=200),
+    admin_session: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
     """
     Admin customers management page
     """
     try:
-        db = next(get_db())
-        users = db.query(User).all()
-        
-        # Add order statistics for each user
-        for user in users:
-            user.order_count = db.query(Order).filter(Order.user_id == user.id).count()
-            user.total_spent = db.query(Order).filter(
-                Order.user_id == user.id,
-                Order.payment_status == 'paid'
-            ).with_entities(db.func.sum(Order.total_amount)).scalar() or 0
+        # Users with their order statistics in a single grouped query
+        rows, total = _paginate(
+            _users_with_order_stats(db).order_by(User.created_at.desc()),
+            page, per_page
+        )
         
-        db.close()
+        users = []
+        for user, order_count, total_spent in rows:
+            user.order_count = user.total_orders = order_count
+            user.total_spent = total_spent or 0
+            users.append(user)
+        
+        # Headline cards cover all customers, not just the current page
+        active_customers = db.query(func.count(User.id)).filter(User.is_active.is_(True)).scalar()
+        all_orders, all_spent = db.query(
+            func.count(Order.id),
+            func.coalesce(func.sum(case((Order.payment_status == 'paid', Order.total_amount), else_=0)), 0)
+        ).one()
+        customer_stats = {
+            "active_customers": active_customers,
+            "avg_orders": all_orders / total if total else 0,
+            "avg_spent": float(all_spent) / total if total else 0
+        }
         
         return templates.TemplateResponse("admin_customers.html", {
             "request": request,
             "admin_user": admin_session['username'],
-            "customers": users
+            "customers": users,
+            "customer_stats": customer_stats,
+            "total": total,
+            "page": page,
+            "per_page": per_page
         })
         
     except Exception as e:
@@ -262,14 +483,16 @@ async def admin_customers(request: Request, admin_session: dict = Depends(get_cu
         raise HTTPException(status_code=500, detail="Error loading customers")
 
 @app.get("/admin/payments", response_class=HTMLResponse)
-async def admin_payments(request: Request, admin_session: dict = Depends(get_current_admin)):
+def admin_payments(
+    request: Request,
+    admin_session: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
     """
     Admin payments management page
     """
     try:
-        db = next(get_db())
         payments = db.query(Payment).join(Order).join(User).order_by(Payment.created_at.desc()).all()
-        db.close()
         
         return templates.TemplateResponse("admin_payments.html", {
             "request": request,
@@ -282,49 +505,31 @@ async def admin_payments(request: Request, admin_session: dict = Depends(get_cur
         raise HTTPException(status_code=500, detail="Error loading payments")
 
 @app.get("/admin/analytics", response_class=HTMLResponse)
-async def admin_analytics(request: Request, admin_session: dict = Depends(get_current_admin)):
+def admin_analytics(
+    request: Request,
+    admin_session: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
     """
     Admin analytics and reports page
     """
     try:
-        db = next(get_db())
-        
-        analytics_data = {
-            'total_orders': db.query(Order).count(),
-            'total_revenue': db.query(Order).filter(Order.payment_status == 'paid').with_entities(
-                db.func.sum(Order.total_amount)
-            ).scalar() or 0,
-            'avg_order_value': db.query(Order).filter(Order.payment_status == 'paid').with_entities(
-                db.func.avg(Order.total_amount)
-            ).scalar() or 0,
-            'conversion_rate': 0
-        }
+        # Skip all aggregation and rendering if the browser copy is current
+        data_version = _data_version(db)
+        cache_headers = _page_cache_headers(admin_session['username'], data_version)
+        if request.headers.get("if-none-match") == cache_headers["ETag"]:
+            return Response(status_code=304, headers=cache_headers)
+        
+        analytics_data, monthly_revenue = compute_analytics(db, data_version)
         
-        monthly_revenue = []
-        for i in range(12):
-            month_start = datetime.now().replace(day=1) - timedelta(days=30*i)
-            month_end = month_start.replace(day=28) + timedelta(days=4)
-            
-            revenue = db.query(Order).filter(
-                Order.payment_status == 'paid',
-                Order.created_at >= month_start,
-                Order.created_at < month_end
-            ).with_entities(db.func.sum(Order.total_amount)).scalar() or 0
-            
-            monthly_revenue.append({
-                'month': month_start.strftime('%Y-%m'),
-                'revenue': float(revenue)
-            })
-        
-        monthly_revenue.reverse()
-        db.close()
-        
-        return templates.TemplateResponse("admin_analytics.html", {
+        response = templates.TemplateResponse("admin_analytics.html", {
             "request": request,
             "admin_user": admin_session['username'],
             "analytics": analytics_data,
             "monthly_revenue": monthly_revenue
         })
+        response.headers.update(cache_headers)
+        return response
         
     except Exception as e:
         logger.error(f"Error loading admin analytics: {e}")
@@ -350,37 +555,43 @@ async def admin_settings(request: Request, admin_session: dict = Depends(get_cur
 # -------------------------------------------------
 
 @app.get("/api/orders")
-async def get_orders(admin_session: dict = Depends(get_current_admin), db: Session = Depends(get_db)):
+def get_orders(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=200),
+    admin_session: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
     """
     Get all orders (API endpoint)
     """
     try:
-        orders = db.query(Order).join(User).order_by(Order.created_at.desc()).all()
-        
-        orders_data = []
-        for order in orders:
-            orders_data.append({
-                "id": order.id,
-                "user_id": order.user_id,
-                "user_name": f"{order.user.first_name} {order.user.last_name}",
-                "service_type": order.service_type,
-                "title": order.title,
-                "status": order.status,
-                "payment_status": order.payment_status,
-                "total_amount": float(order.total_amount),
-                "currency": order.currency,
-                "created_at": order.created_at.isoformat(),
-                "deadline": order.deadline.isoformat() if order.deadline else None
-            })
-        
-        return JSONResponse(content={"orders": orders_data})
+        # Select only the rendered columns; rows skip ORM entity hydration
+        stmt = select(
+            Order.id,
+            Order.user_id,
+            User.full_name.label("user_name"),
+            Order.service_type,
+            Order.subject.label("title"),
+            Order.status,
+            Order.payment_status,
+            Order.total_amount,
+            Order.currency,
+            Order.created_at,
+            Order.deadline
+        ).join(User, Order.user_id == User.id).order_by(Order.created_at.desc())
+        
+        total = db.scalar(select(func.count(Order.id)))
+        rows = db.execute(stmt.limit(per_page).offset((page - 1) * per_page)).all()
+        orders_data = [dict(row._mapping) for row in rows]
+        
+        return {"orders": orders_data, "total": total, "page": page, "per_page": per_page}
         
     except Exception as e:
         logger.error(f"Error fetching orders: {e}")
         raise HTTPException(status_code=500, detail="Error fetching orders")
 
 @app.put("/api/orders/{order_id}/status")
-async def update_order_status(
+def update_order_status(
     order_id: int,
     status: str = Form(...),
     admin_session: dict = Depends(get_current_admin),
@@ -401,7 +612,7 @@ async def update_order_status(
         
         logger.info(f"Order {order_id} status updated to {status} by {admin_session['username']}")
         
-        return JSONResponse(content={"detail": "Order status updated successfully"})
+        return {"detail": "Order status updated successfully"}
         
     except Exception as e:
         logger.error(f"Error updating order status: {e}")
@@ -409,36 +620,34 @@ async def update_order_status(
         raise HTTPException(status_code=500, detail="Error updating order status")
 
 @app.get("/api/users")
-async def get_users(admin_session: dict = Depends(get_current_admin), db: Session = Depends(get_db)):
+def get_users(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=200),
+    admin_session: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
     """
     Get all users (API endpoint)
     """
     try:
-        users = db.query(User).order_by(User.created_at.desc()).all()
-        
-        users_data = []
-        for user in users:
-            order_count = db.query(Order).filter(Order.user_id == user.id).count()
-            total_spent = db.query(Order).filter(
-                Order.user_id == user.id,
-                Order.payment_status == 'paid'
-            ).with_entities(db.func.sum(Order.total_amount)).scalar() or 0
-            
-            users_data.append({
-                "id": user.id,
-                "telegram_id": user.telegram_id,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "username": user.username,
-                "email": user.email,
-                "phone": user.phone,
-                "country": user.country,
-                "created_at": user.created_at.isoformat(),
-                "order_count": order_count,
-                "total_spent": float(total_spent)
-            })
-        
-        return JSONResponse(content={"users": users_data})
+        stmt = select(
+            User.id,
+            User.telegram_id,
+            User.full_name,
+            User.telegram_username.label("username"),
+            User.email,
+            User.phone,
+            User.country,
+            User.created_at,
+            _order_count.label("order_count"),
+            _total_spent.label("total_spent")
+        ).outerjoin(Order, Order.user_id == User.id).group_by(User.id).order_by(User.created_at.desc())
+        
+        total = db.scalar(select(func.count(User.id)))
+        rows = db.execute(stmt.limit(per_page).offset((page - 1) * per_page)).all()
+        users_data = [dict(row._mapping) for row in rows]
+        
+        return {"users": users_data, "total": total, "page": page, "per_page": per_page}
         
     except Exception as e:
         logger.error(f"Error fetching users: {e}")
@@ -466,6 +675,17 @@ async def root():
 # Application Startup
 # -------------------------------------------------
 
+async def _session_sweeper(interval: int = 60):
+    """
+    Periodically remove expired admin sessions
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            auth_service.cleanup_expired_sessions()
+        except Exception as e:
+            logger.error(f"Session cleanup failed: {e}")
+
 @app.on_event("startup")
 async def startup_event():
     """
@@ -481,6 +701,14 @@ async def startup_event():
         logger.error(f"Database initialization failed: {e}")
         raise
     
+    # Compile all templates up front so the first page view doesn't pay for it
+    for template_path in Path("templates").rglob("*.html"):
+        templates.env.get_template(template_path.relative_to("templates").as_posix())
+    logger.info("Templates precompiled")
+    
+    # Sweep expired admin sessions in the background instead of per request
+    app.state.session_sweeper = asyncio.create_task(_session_sweeper())
+    
     logger.info("Student Services Platform started successfully")
 
 @app.on_event("shutdown")
@@ -489,12 +717,35 @@ async def shutdown_event():
     Application shutdown event
     """
     logger.info("Shutting down Student Services Platform...")
+    
+    sweeper = getattr(app.state, "session_sweeper", None)
+    if sweeper:
+        sweeper.cancel()
+        try:
+            await sweeper
+        except asyncio.CancelledError:
+            pass
+    
+    # Flush any queued log records
+    log_listener.stop()
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "main_simplified:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
+    if settings.debug:
+        uvicorn.run(
+            "app.api.main:app",
+            host=settings.api_host,
+            port=settings.api_port,
+            reload=True,
+            log_level="info"
+        )
+    else:
+        uvicorn.run(
+            "app.api.main:app",
+            host=settings.api_host,
+            port=settings.api_port,
+            workers=int(os.getenv("WORKERS", "1")),
+            loop="uvloop",
+            http="httptools",
+            proxy_headers=True,
+            access_log=False
+        )
@@ -5,13 +5,21 @@ Multi-language bot with Arabic support and improved user journey
 """
 
 import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
+import re
 import sys
 import os
 from pathlib import Path
+from types import MappingProxyType
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
-from contextlib import contextmanager
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import orjson
+from cachetools import TTLCache
 
 # Add project root to Python path
 project_root = Path(__file__).parent.parent.parent
@@ -19,32 +27,57 @@ sys.path.insert(0, str(project_root))
 
 # Import aiogram
 try:
-    from aiogram import Bot, Dispatcher, types, F
+    from aiogram import Bot, Dispatcher, BaseMiddleware, types, F
     from aiogram.filters import Command, StateFilter
+    from aiogram.filters.callback_data import CallbackData
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+    from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
     from aiogram.fsm.context import FSMContext
     from aiogram.fsm.storage.memory import MemoryStorage
-    from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+    from aiogram.fsm.storage.redis import RedisStorage
+    from aiogram.types import Message, CallbackQuery, ErrorEvent, InlineKeyboardMarkup, InlineKeyboardButton
     from aiogram.utils.keyboard import InlineKeyboardBuilder
-    from sqlalchemy.orm import Session
+    from sqlalchemy import select, func, lambda_stmt
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+    from sqlalchemy.exc import SQLAlchemyError
 except ImportError as e:
     print(f"Error: aiogram not available: {e}")
     sys.exit(1)
 
 # Import application modules
 from config.config import settings
-from app.models.database import get_db, init_database
-from app.models.models import User, Order, Payment, Feedback
+from app.models.database import AsyncSessionLocal, async_engine, init_database, ASYNC_POOL_CAPACITY
+from app.models.models import User, Order, Payment, Feedback, OrderCounter
 from app.services.pricing import PricingService
 from app.services.payment import PaymentService
 
 # Import existing states
 from app.bot.states import OrderStates, FeedbackStates, SupportStates, RegistrationStates
 
-# Simple logging setup
+# Logging setup
+# Handlers only enqueue records; a listener thread does the file/stdout I/O off the event loop
+os.makedirs("logs", exist_ok=True)
+_log_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+_log_file_handler = logging.handlers.RotatingFileHandler(
+    "logs/bot.log", maxBytes=50_000_000, backupCount=5
+)
+_log_stream_handler = logging.StreamHandler(sys.stdout)
+for _handler in (_log_file_handler, _log_stream_handler):
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(
+    _log_queue, _log_file_handler, _log_stream_handler, respect_handler_level=True
+)
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s - %(message)s"
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger("telegram-bot")
 
 # -------------------------------------------------
@@ -155,6 +188,116 @@ Please select your payment method:'''
 📅 **Date Only:** "2024-12-25"
 ⏱️ **Hours:** "24 hours" or "48 hours"
 ⏱️ **Days:** "3 days" or "7 days"'''
+        },
+        'payment_details': {
+            'stripe': '''💳 **Credit/Debit Card Payment**
+
+You will be redirected to our secure Stripe payment page.
+
+This feature is currently being set up. Please contact support for payment assistance.''',
+            'bank': '''🏦 **Bank Transfer Payment**
+
+**Bank Details:**
+🏛️ Bank: Emirates NBD
+👤 Account Name: Student Services
+🔢 Account Number: 1234567890
+🌐 IBAN: AE07 0331 2345 6789 0123 456
+📧 SWIFT: EBILAEAD
+
+**Instructions:**
+1. Transfer the exact amount to the above account
+2. Send us the receipt via support
+3. We'll verify your payment within 24 hours
+
+⚠️ **Important:** Include your order number in the transfer reference'''
+        },
+        'orders': {
+            'recent_header': "📋 **Your Recent Orders:**\n\n",
+            'empty': "📋 **Your Orders**\n\nYou haven't placed any orders yet.\n\nClick 'New Order' to get started!"
+        },
+        'info': {
+            'support': '''🆘 **Support & Help**
+
+**Contact Information:**
+📧 Email: support@studentservices.com
+💬 Telegram: Available 24/7
+
+**Common Issues:**
+• Payment problems
+• Order modifications
+• Technical support
+• General inquiries
+
+**Response Time:**
+🕐 Usually within 2-4 hours
+⚡ Urgent issues: Contact immediately
+
+How can we help you today?''',
+            'help': '''ℹ️ **Help & Information**
+
+**How to place an order:**
+1️⃣ Click "📝 New Order"
+2️⃣ Select service type
+3️⃣ Fill in requirements
+4️⃣ Choose payment method
+5️⃣ Complete payment
+
+**Available Services:**
+📝 Assignments & Essays
+💻 IT Projects
+📊 Presentations
+🔄 Redesign Services
+📚 Course Summaries
+⚡ Express Services (24h)
+
+**Payment Methods:**
+💳 Credit/Debit Card (Stripe)
+🏦 Bank Transfer
+
+Need more help? Contact our support team!''',
+            'commands_help': '''🆘 **Help & Support**
+
+**Available Commands:**
+/start - Start the bot and show main menu
+/orders - View your orders
+/cancel - Cancel current operation
+/help - Show this help message
+
+**How to place an order:**
+1️⃣ Click "📝 New Order"
+2️⃣ Select service type
+3️⃣ Fill in requirements
+4️⃣ Choose payment method
+5️⃣ Complete payment
+
+**Payment Methods:**
+💳 Credit/Debit Card (Instant)
+🏦 Bank Transfer (24h verification)
+
+**Support:**
+📧 Email: support@studentservices.com
+
+**Business Hours:**
+🕐 24/7 Support Available''',
+            'cancelled': "❌ **Operation Cancelled**\n\nReturning to main menu..."
+        },
+        'feedback': {
+            'invalid_rating': "❌ Please send a valid rating from 1 to 5.",
+            'rating_received': '''{stars} **Thank you for your rating!**
+
+Would you like to add any comments? (Optional)
+
+Send your comments or type "skip" to finish:''',
+            'submitted': '''✅ **Feedback Submitted!**
+
+{stars} Rating: {rating}/5
+
+Thank you for helping us improve our service!'''
+        },
+        'files': {
+            'invalid': "❌ Please send a valid document file.",
+            'too_large': "❌ File too large. Maximum size is 20MB.",
+            'received': "✅ File received: {file_name}\n\nFile upload processing is being set up. Please contact support for file submissions."
         }
     },
     'ar': {
@@ -260,34 +403,191 @@ Please select your payment method:'''
 📅 **التاريخ فقط:** "2024-12-25"
 ⏱️ **الساعات:** "24 hours" أو "48 hours"
 ⏱️ **الأيام:** "3 days" أو "7 days"'''
+        },
+        'payment_details': {
+            'stripe': '''💳 **الدفع بالبطاقة الائتمانية**
+
+سيتم توجيهك إلى صفحة الدفع الآمنة عبر Stripe.
+
+هذه الميزة قيد الإعداد حالياً. يرجى التواصل مع الدعم للمساعدة في الدفع.''',
+            'bank': '''🏦 **الدفع عبر التحويل البنكي**
+
+**تفاصيل البنك:**
+🏛️ البنك: بنك الإمارات دبي الوطني
+👤 اسم الحساب: Student Services
+🔢 رقم الحساب: 1234567890
+🌐 IBAN: AE07 0331 2345 6789 0123 456
+📧 SWIFT: EBILAEAD
+
+**التعليمات:**
+1. حول المبلغ الدقيق إلى الحساب أعلاه
+2. أرسل لنا إيصال التحويل عبر الدعم
+3. سنتحقق من دفعتك خلال 24 ساعة
+
+⚠️ **مهم:** اذكر رقم طلبك في مرجع التحويل'''
+        },
+        'orders': {
+            'recent_header': "📋 **طلباتك الأخيرة:**\n\n",
+            'empty': "📋 **طلباتك**\n\nلم تقم بوضع أي طلبات بعد.\n\nانقر على 'طلب جديد' للبدء!"
+        },
+        'info': {
+            'support': '''🆘 **الدعم والمساعدة**
+
+**معلومات التواصل:**
+📧 البريد الإلكتروني: support@studentservices.com
+💬 تليجرام: متاح 24/7
+
+**المشاكل الشائعة:**
+• مشاكل الدفع
+• تعديل الطلبات
+• الدعم التقني
+• استفسارات عامة
+
+**وقت الاستجابة:**
+🕐 عادة خلال 2-4 ساعات
+⚡ المشاكل العاجلة: تواصل فوراً
+
+كيف يمكننا مساعدتك اليوم؟''',
+            'help': '''ℹ️ **المساعدة والمعلومات**
+
+**كيفية وضع طلب:**
+1️⃣ انقر على "📝 طلب جديد"
+2️⃣ اختر نوع الخدمة
+3️⃣ املأ المتطلبات
+4️⃣ اختر طريقة الدفع
+5️⃣ أكمل الدفع
+
+**الخدمات المتاحة:**
+📝 الواجبات والمقالات
+💻 المشاريع التقنية
+📊 العروض التقديمية
+🔄 خدمات إعادة التصميم
+📚 ملخصات المقررات
+⚡ الخدمات السريعة (24 ساعة)
+
+**طرق الدفع:**
+💳 البطاقة الائتمانية (Stripe)
+🏦 التحويل البنكي
+
+تحتاج مساعدة أكثر؟ تواصل مع فريق الدعم!''',
+            'commands_help': '''🆘 **المساعدة والدعم**
+
+**الأوامر المتاحة:**
+/start - بدء البوت وعرض القائمة الرئيسية
+/orders - عرض طلباتك
+/cancel - إلغاء العملية الحالية
+/help - عرض رسالة المساعدة هذه
+
+**كيفية وضع طلب:**
+1️⃣ انقر على "📝 طلب جديد"
+2️⃣ اختر نوع الخدمة
+3️⃣ املأ المتطلبات
+4️⃣ اختر طريقة الدفع
+5️⃣ أكمل الدفع
+
+**طرق الدفع:**
+💳 البطاقة الائتمانية (فوري)
+🏦 التحويل البنكي (تحقق خلال 24 ساعة)
+
+**الدعم:**
+📧 البريد الإلكتروني: support@studentservices.com
+
+**ساعات العمل:**
+🕐 دعم متاح 24/7''',
+            'cancelled': "❌ **تم إلغاء العملية**\n\nالعودة إلى القائمة الرئيسية..."
+        },
+        'feedback': {
+            'invalid_rating': "❌ يرجى إرسال تقييم صحيح من 1 إلى 5.",
+            'rating_received': '''{stars} **شكراً لك على تقييمك!**
+
+هل تريد إضافة أي تعليقات؟ (اختياري)
+
+أرسل تعليقاتك أو اكتب "skip" للانتهاء:''',
+            'submitted': '''✅ **تم إرسال التقييم!**
+
+{stars} التقييم: {rating}/5
+
+شكراً لك لمساعدتنا في تحسين خدمتنا!'''
+        },
+        'files': {
+            'invalid': "❌ يرجى إرسال ملف صحيح.",
+            'too_large': "❌ الملف كبير جداً. الحد الأقصى 20 ميجابايت.",
+            'received': "✅ تم استلام الملف: {file_name}\n\nمعالجة رفع الملفات قيد الإعداد. يرجى التواصل مع الدعم لإرسال الملفات."
         }
     }
 }
 
+def _flatten_messages(messages: Dict[str, Any], prefix: str = '') -> Dict[str, str]:
+    """Flatten nested message groups into dotted keys ('main_menu.new_order')"""
+    flat = {}
+    for name, value in messages.items():
+        path = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(_flatten_messages(value, f"{path}."))
+        else:
+            flat[path] = value
+    return flat
+
+# (lang, dotted key) -> text, built once so lookups are a single dict hit; read-only
+_FLAT_MESSAGES = MappingProxyType({
+    (lang, key): text
+    for lang, messages in MESSAGES.items()
+    for key, text in _flatten_messages(messages).items()
+})
+
 def get_text(lang: str, key: str, **kwargs) -> str:
     """Get localized text with formatting"""
-    keys = key.split('.')
-    text = MESSAGES.get(lang, MESSAGES['en'])
+    text = _FLAT_MESSAGES.get((lang, key)) or _FLAT_MESSAGES.get(('en', key), key)
     
-    for k in keys:
-        text = text.get(k, key)
-    
-    if isinstance(text, str) and kwargs:
-        return text.format(**kwargs)
+    if kwargs:
+        return text.format_map(kwargs)
     return text
 
+# Constant head of the main-menu text; only the name part is formatted per call
+WELCOME_PREFIX = {lang: get_text(lang, 'welcome_title') + '\n\n' for lang in MESSAGES}
+
+# Characters with meaning in Telegram's legacy Markdown parse mode
+MARKDOWN_ESCAPE = str.maketrans({c: '\\' + c for c in '_*`['})
+
+def escape_md(text: str) -> str:
+    """Escape user-supplied text before it is rendered as Markdown"""
+    return text.translate(MARKDOWN_ESCAPE)
+
+# Deadline input formats: "2024-12-25", "2024-12-25 14:30", "48 hours", "3 days"
+DEADLINE_DATE_RE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})(?:\s+(\d{1,2}):(\d{1,2}))?$')
+DEADLINE_DURATION_RE = re.compile(r'^(\d+)\s*(hour|day)s?$', re.IGNORECASE)
+
+# Order status icons used in order listings
+STATUS_EMOJI = {
+    'pending': '⏳',
+    'confirmed': '✅',
+    'in_progress': '🔄',
+    'delivered': '📦',
+    'completed': '✅',
+    'cancelled': '❌'
+}
+
 # -------------------------------------------------
 # Keyboard Builders
 # -------------------------------------------------
 
+class SelectionCallback(CallbackData, prefix="sel"):
+    """Packed callback data for choice buttons, e.g. "sel:service:assignment" """
+    action: str
+    value: str
+
+# Menus are static per language, so each markup is built once and reused
+
+@lru_cache(maxsize=8)
 def get_language_keyboard():
     """Language selection keyboard"""
     keyboard = InlineKeyboardBuilder()
-    keyboard.button(text="English 🇬🇧", callback_data="lang_en")
-    keyboard.button(text="العربية 🇸🇦", callback_data="lang_ar")
+    keyboard.button(text="English 🇬🇧", callback_data=SelectionCallback(action="lang", value="en").pack())
+    keyboard.button(text="العربية 🇸🇦", callback_data=SelectionCallback(action="lang", value="ar").pack())
     keyboard.adjust(1)
     return keyboard.as_markup()
 
+@lru_cache(maxsize=8)
 def get_main_menu_keyboard(lang: str = 'en'):
     """Main menu keyboard"""
     keyboard = InlineKeyboardBuilder()
@@ -298,46 +598,59 @@ def get_main_menu_keyboard(lang: str = 'en'):
     keyboard.adjust(2)
     return keyboard.as_markup()
 
+@lru_cache(maxsize=8)
 def get_services_keyboard(lang: str = 'en'):
     """Services selection keyboard"""
     keyboard = InlineKeyboardBuilder()
-    keyboard.button(text=get_text(lang, 'services.assignment'), callback_data="service_assignment")
-    keyboard.button(text=get_text(lang, 'services.project'), callback_data="service_project")
-    keyboard.button(text=get_text(lang, 'services.presentation'), callback_data="service_presentation")
-    keyboard.button(text=get_text(lang, 'services.redesign'), callback_data="service_redesign")
-    keyboard.button(text=get_text(lang, 'services.summary'), callback_data="service_summary")
-    keyboard.button(text=get_text(lang, 'services.express'), callback_data="service_express")
+    keyboard.button(text=get_text(lang, 'services.assignment'), callback_data=SelectionCallback(action="service", value="assignment").pack())
+    keyboard.button(text=get_text(lang, 'services.project'), callback_data=SelectionCallback(action="service", value="project").pack())
+    keyboard.button(text=get_text(lang, 'services.presentation'), callback_data=SelectionCallback(action="service", value="presentation").pack())
+    keyboard.button(text=get_text(lang, 'services.redesign'), callback_data=SelectionCallback(action="service", value="redesign").pack())
+    keyboard.button(text=get_text(lang, 'services.summary'), callback_data=SelectionCallback(action="service", value="summary").pack())
+    keyboard.button(text=get_text(lang, 'services.express'), callback_data=SelectionCallback(action="service", value="express").pack())
     keyboard.adjust(2)
     return keyboard.as_markup()
 
+@lru_cache(maxsize=8)
 def get_academic_level_keyboard(lang: str = 'en'):
     """Academic level selection keyboard"""
     keyboard = InlineKeyboardBuilder()
-    keyboard.button(text=get_text(lang, 'academic_levels.high_school'), callback_data="level_high_school")
-    keyboard.button(text=get_text(lang, 'academic_levels.bachelor'), callback_data="level_bachelor")
-    keyboard.button(text=get_text(lang, 'academic_levels.masters'), callback_data="level_masters")
-    keyboard.button(text=get_text(lang, 'academic_levels.phd'), callback_data="level_phd")
+    keyboard.button(text=get_text(lang, 'academic_levels.high_school'), callback_data=SelectionCallback(action="level", value="high_school").pack())
+    keyboard.button(text=get_text(lang, 'academic_levels.bachelor'), callback_data=SelectionCallback(action="level", value="bachelor").pack())
+    keyboard.button(text=get_text(lang, 'academic_levels.masters'), callback_data=SelectionCallback(action="level", value="masters").pack())
+    keyboard.button(text=get_text(lang, 'academic_levels.phd'), callback_data=SelectionCallback(action="level", value="phd").pack())
     keyboard.adjust(2)
     return keyboard.as_markup()
 
+@lru_cache(maxsize=8)
 def get_currency_keyboard(lang: str = 'en'):
     """Currency selection keyboard - AED as main currency"""
     keyboard = InlineKeyboardBuilder()
     # AED first as main currency
-    keyboard.button(text=get_text(lang, 'currencies.AED'), callback_data="currency_AED")
-    keyboard.button(text=get_text(lang, 'currencies.USD'), callback_data="currency_USD")
-    keyboard.button(text=get_text(lang, 'currencies.JOD'), callback_data="currency_JOD")
+    keyboard.button(text=get_text(lang, 'currencies.AED'), callback_data=SelectionCallback(action="currency", value="AED").pack())
+    keyboard.button(text=get_text(lang, 'currencies.USD'), callback_data=SelectionCallback(action="currency", value="USD").pack())
+    keyboard.button(text=get_text(lang, 'currencies.JOD'), callback_data=SelectionCallback(action="currency", value="JOD").pack())
     keyboard.adjust(1)
     return keyboard.as_markup()
 
+@lru_cache(maxsize=8)
 def get_payment_keyboard(lang: str = 'en'):
     """Payment method selection keyboard"""
     keyboard = InlineKeyboardBuilder()
-    keyboard.button(text=get_text(lang, 'payment_methods.stripe'), callback_data="pay_stripe")
-    keyboard.button(text=get_text(lang, 'payment_methods.bank'), callback_data="pay_bank")
+    keyboard.button(text=get_text(lang, 'payment_methods.stripe'), callback_data=SelectionCallback(action="pay", value="stripe").pack())
+    keyboard.button(text=get_text(lang, 'payment_methods.bank'), callback_data=SelectionCallback(action="pay", value="bank").pack())
     keyboard.adjust(1)
     return keyboard.as_markup()
 
+# Build every language's keyboards at import so no user pays the first build
+get_language_keyboard()
+for _lang in MESSAGES:
+    for _build_keyboard in (
+        get_main_menu_keyboard, get_services_keyboard, get_academic_level_keyboard,
+        get_currency_keyboard, get_payment_keyboard
+    ):
+        _build_keyboard(_lang)
+
 # -------------------------------------------------
 # Database Manager
 # -------------------------------------------------
@@ -346,18 +659,146 @@ class DatabaseManager:
     """Simple database session manager"""
     
     @staticmethod
-    @contextmanager
-    def get_session():
-        """Get database session with proper cleanup"""
-        db = next(get_db())
+    @asynccontextmanager
+    async def get_session():
+        """Get pooled async database session with proper cleanup"""
+        async with AsyncSessionLocal() as db:
+            try:
+                yield db
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Database error: {e}")
+                raise
+    
+    @staticmethod
+    def upsert(db, model):
+        """Dialect-specific INSERT supporting ON CONFLICT (PostgreSQL or SQLite)"""
+        dialect = db.bind.dialect.name
+        if dialect == "postgresql":
+            return pg_insert(model)
+        if dialect == "sqlite":
+            return sqlite_insert(model)
+        raise NotImplementedError(f"Upsert is not supported for the '{dialect}' dialect")
+    
+    @staticmethod
+    async def allocate_order_numbers(db, count: int = 1) -> List[str]:
+        """Reserve `count` consecutive order numbers for today with a single atomic upsert"""
+        day = datetime.now().strftime('%Y%m%d')
+        
+        if await db.get(OrderCounter, day) is None:
+            # Seed a missing counter from orders already numbered today (e.g. created before the counter table existed)
+            prefix = f"SS{day}"
+            highest = await db.scalar(
+                select(func.max(Order.order_number)).where(Order.order_number.like(f"{prefix}%"))
+            )
+            seed = DatabaseManager.upsert(db, OrderCounter).values(day=day, value=int(highest[len(prefix):]) if highest else 0)
+            await db.execute(seed.on_conflict_do_nothing(index_elements=[OrderCounter.day]))
+        
+        stmt = DatabaseManager.upsert(db, OrderCounter).values(day=day, value=count)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OrderCounter.day],
+            set_={'value': OrderCounter.value + count}
+        ).returning(OrderCounter.value)
+        
+        last = await db.scalar(stmt)
+        return [f"SS{day}{sequence:04d}" for sequence in range(last - count + 1, last + 1)]
+    
+    @staticmethod
+    async def next_order_number(db) -> str:
+        """Allocate the next order number for today"""
+        return (await DatabaseManager.allocate_order_numbers(db))[0]
+
+# User dicts keyed by Telegram ID; almost every handler resolves the user first
+_user_cache = TTLCache(maxsize=10_000, ttl=3600)
+
+# -------------------------------------------------
+# Cached Statements
+# -------------------------------------------------
+# lambda_stmt caches statement construction as well as compilation;
+# only the bound parameters change between calls.
+
+def user_by_telegram_id_stmt(telegram_id: str):
+    """User lookup by Telegram ID"""
+    return lambda_stmt(lambda: select(User).where(User.telegram_id == telegram_id))
+
+def recent_orders_stmt(user_id: int):
+    """Last 5 orders for the 'My Orders' menu"""
+    return lambda_stmt(
+        lambda: select(Order.order_number, Order.status, Order.subject)
+        .where(Order.user_id == user_id)
+        .order_by(Order.created_at.desc())
+        .limit(5)
+    )
+
+def order_history_stmt(user_id: int):
+    """Last 10 orders for /orders"""
+    return lambda_stmt(
+        lambda: select(
+            Order.order_number, Order.status, Order.service_type, Order.subject,
+            Order.total_amount, Order.currency, Order.created_at
+        )
+        .where(Order.user_id == user_id)
+        .order_by(Order.created_at.desc())
+        .limit(10)
+    )
+
+# -------------------------------------------------
+# Concurrency Limit Middleware
+# -------------------------------------------------
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """Cap how many updates are processed at once; polling runs each update as its own task"""
+    
+    def __init__(self, limit: int):
+        self._semaphore = asyncio.Semaphore(limit)
+    
+    async def __call__(self, handler, event, data):
+        async with self._semaphore:
+            return await handler(event, data)
+
+# -------------------------------------------------
+# Flood Control Request Middleware
+# -------------------------------------------------
+
+class RetryAfterMiddleware(BaseRequestMiddleware):
+    """Wait out short Telegram flood limits instead of failing the reply"""
+    
+    def __init__(self, max_retries: int = 2, max_wait: int = 5):
+        self.max_retries = max_retries
+        # Longer waits would hold a concurrency slot for the whole sleep
+        self.max_wait = max_wait
+    
+    async def __call__(self, make_request, bot, method):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries or e.retry_after > self.max_wait:
+                    raise
+                logger.warning(f"Flood limit on {type(method).__name__}, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+
+# -------------------------------------------------
+# Error Handling Middleware
+# -------------------------------------------------
+
+class ErrorMiddleware(BaseMiddleware):
+    """Catch handler errors once for all messages and callbacks"""
+    
+    async def __call__(self, handler, event, data):
         try:
-            yield db
+            return await handler(event, data)
         except Exception as e:
-            db.rollback()
-            logger.error(f"Database error: {e}")
-            raise
-        finally:
-            db.close()
+            logger.exception(f"Error handling {type(event).__name__}: {e}")
+            
+            try:
+                if isinstance(event, CallbackQuery):
+                    await event.answer("❌ Error occurred")
+                elif isinstance(event, Message):
+                    await event.answer("❌ An error occurred. Please try again.\n❌ حدث خطأ. يرجى المحاولة مرة أخرى.")
+            except TelegramAPIError:
+                # The user may have blocked the bot; nothing more to do
+                logger.debug("Failed to send error reply", exc_info=True)
 
 # -------------------------------------------------
 # Main Bot Class
@@ -372,8 +813,19 @@ class StudentServicesBot:
         if not settings.telegram_bot_token:
             raise ValueError("TELEGRAM_BOT_TOKEN is required")
         
-        self.bot = Bot(token=settings.telegram_bot_token)
-        self.dp = Dispatcher(storage=MemoryStorage())
+        # One keep-alive HTTP session for every Bot API call, sized for concurrent handlers
+        # All bot texts use Markdown; set it once instead of per call
+        self.bot = Bot(
+            token=settings.telegram_bot_token,
+            session=AiohttpSession(
+                limit=200,
+                json_loads=orjson.loads,
+                json_dumps=lambda value: orjson.dumps(value).decode()
+            ),
+            default=DefaultBotProperties(parse_mode="Markdown")
+        )
+        self.bot.session.middleware(RetryAfterMiddleware())
+        self.dp = Dispatcher(storage=self._create_storage())
         self.pricing_service = PricingService()
         self.payment_service = PaymentService()
         
@@ -382,17 +834,48 @@ class StudentServicesBot:
         
         logger.info("Student Services Bot initialized successfully")
     
+    @staticmethod
+    def _create_storage():
+        """FSM storage: Redis when configured (shared, expiring), memory otherwise"""
+        if not settings.redis_url:
+            return MemoryStorage()
+        
+        # Abandoned order flows expire instead of piling up
+        return RedisStorage.from_url(
+            settings.redis_url,
+            state_ttl=timedelta(hours=24),
+            data_ttl=timedelta(hours=24)
+        )
+    
     def _register_handlers(self):
         """Register all bot handlers"""
         
+        # Bound concurrent updates to the DB pool capacity so bursts queue here
+        # instead of timing out on pool checkout
+        self.dp.update.outer_middleware(ConcurrencyLimitMiddleware(
+            min(settings.telegram_max_concurrent_updates, ASYNC_POOL_CAPACITY)
+        ))
+        
+        # Handler errors are logged and answered here instead of in every handler
+        self.dp.message.outer_middleware(ErrorMiddleware())
+        self.dp.callback_query.outer_middleware(ErrorMiddleware())
+        
         # Command handlers
         self.dp.message.register(self.cmd_start, Command("start"))
         self.dp.message.register(self.cmd_help, Command("help"))
         self.dp.message.register(self.cmd_orders, Command("orders"))
         self.dp.message.register(self.cmd_cancel, Command("cancel"))
         
-        # Language selection
-        self.dp.callback_query.register(self.handle_language_selection, F.data.startswith("lang_"))
+        # Choice buttons (language, service, level, currency, payment) share one
+        # callback filter and are dispatched on the packed action
+        self.selection_handlers = {
+            'lang': self.handle_language_selection,
+            'service': self.handle_service_selection,
+            'level': self.handle_academic_level,
+            'currency': self.handle_currency_selection,
+            'pay': self.handle_payment_method,
+        }
+        self.dp.callback_query.register(self.dispatch_selection, SelectionCallback.filter())
         
         # Main menu handlers
         self.dp.callback_query.register(self.handle_new_order, F.data == "new_order")
@@ -400,18 +883,6 @@ class StudentServicesBot:
         self.dp.callback_query.register(self.handle_contact_support, F.data == "contact_support")
         self.dp.callback_query.register(self.handle_help, F.data == "help")
         
-        # Service selection
-        self.dp.callback_query.register(self.handle_service_selection, F.data.startswith("service_"))
-        
-        # Academic level selection
-        self.dp.callback_query.register(self.handle_academic_level, F.data.startswith("level_"))
-        
-        # Currency selection
-        self.dp.callback_query.register(self.handle_currency_selection, F.data.startswith("currency_"))
-        
-        # Payment method selection
-        self.dp.callback_query.register(self.handle_payment_method, F.data.startswith("pay_"))
-        
         # State handlers
         self.dp.message.register(self.handle_subject_input, StateFilter(OrderStates.subject))
         self.dp.message.register(self.handle_requirements_input, StateFilter(OrderStates.requirements))
@@ -426,968 +897,652 @@ class StudentServicesBot:
         self.dp.message.register(self.handle_file_upload, F.document)
         
         # Error handler
-        self.dp.error.register(self.error_handler)
+        self.dp.errors.register(self.error_handler)
     
     async def cmd_start(self, message: Message, state: FSMContext):
         """Handle /start command - Language selection first"""
-        try:
-            await state.clear()
-            
-            # Check if user exists and has language preference
-            user = await self._get_user_if_exists(message.from_user)
-            
-            if user and user.get('language'):
-                # User exists with language preference, show main menu
-                await self._show_main_menu(message, user['language'], user['full_name'])
-            else:
-                # New user or no language set, show language selection
-                welcome_text = """🎓 **Welcome to Student Services Platform!**
+        await state.clear()
+        
+        # Check if user exists and has language preference
+        user = await self._get_user_if_exists(message.from_user)
+        
+        if user and user.get('language'):
+            # User exists with language preference, show main menu
+            await self._show_main_menu(message, user['language'], user['full_name'])
+        else:
+            # New user or no language set, show language selection
+            welcome_text = """🎓 **Welcome to Student Services Platform!**
 مرحباً بك في منصة الخدمات الطلابية!
 
 Please select your preferred language:
 يرجى اختيار لغتك المفضلة:"""
-                
-                await message.answer(
-                    welcome_text,
-                    reply_markup=get_language_keyboard(),
-                    parse_mode="Markdown"
-                )
             
-            logger.info(f"User {message.from_user.id} started the bot")
-            
-        except Exception as e:
-            logger.error(f"Error in start command: {e}")
-            await message.answer("❌ An error occurred. Please try again.\n❌ حدث خطأ. يرجى المحاولة مرة أخرى.")
+            await message.answer(
+                welcome_text,
+                reply_markup=get_language_keyboard()
+            )
+        
+        logger.info(f"User {message.from_user.id} started the bot")
     
-    async def handle_language_selection(self, callback: CallbackQuery, state: FSMContext):
-        """Handle language selection"""
-        try:
+    async def dispatch_selection(self, callback: CallbackQuery, callback_data: SelectionCallback, state: FSMContext):
+        """Route a choice button to its handler by action"""
+        handler = self.selection_handlers.get(callback_data.action)
+        if not handler:
             await callback.answer()
-            
-            language = callback.data.replace("lang_", "")
-            
-            # Create or update user with language preference
-            user = await self._get_or_create_user(callback.from_user, language)
-            
-            # Show main menu in selected language
-            await self._show_main_menu_callback(callback, language, user['full_name'])
-            
-            logger.info(f"User {callback.from_user.id} selected language: {language}")
-            
-        except Exception as e:
-            logger.error(f"Error in language selection: {e}")
-            await callback.answer("❌ Error occurred")
+            return
+        
+        await handler(callback, callback_data.value, state)
     
-    async def _show_main_menu(self, message: Message, lang: str, name: str):
-        """Show main menu message"""
-        welcome_text = get_text(lang, 'welcome_title') + '\n\n' + get_text(lang, 'welcome_message', name=name)
+    async def handle_language_selection(self, callback: CallbackQuery, language: str, state: FSMContext):
+        """Handle language selection"""
+        await callback.answer()
         
-        await message.answer(
+        # Create or update user with language preference
+        user = await self._get_or_create_user(callback.from_user, language)
+        
+        # Show main menu in selected language
+        await self._show_main_menu_callback(callback, language, user['full_name'])
+        
+        logger.info(f"User {callback.from_user.id} selected language: {language}")
+    
+    async def _show_main_menu(self, message: Message, lang: str, name: str):
+        """Show main menu message"""
+        welcome_text = WELCOME_PREFIX.get(lang, WELCOME_PREFIX['en']) + get_text(lang, 'welcome_message', name=escape_md(name))
+        
+        await message.answer(
             welcome_text,
-            reply_markup=get_main_menu_keyboard(lang),
-            parse_mode="Markdown"
+            reply_markup=get_main_menu_keyboard(lang)
         )
     
     async def _show_main_menu_callback(self, callback: CallbackQuery, lang: str, name: str):
         """Show main menu via callback"""
-        welcome_text = get_text(lang, 'welcome_title') + '\n\n' + get_text(lang, 'welcome_message', name=name)
+        welcome_text = WELCOME_PREFIX.get(lang, WELCOME_PREFIX['en']) + get_text(lang, 'welcome_message', name=escape_md(name))
         
         await callback.message.edit_text(
             welcome_text,
-            reply_markup=get_main_menu_keyboard(lang),
-            parse_mode="Markdown"
+            reply_markup=get_main_menu_keyboard(lang)
         )
     
     async def handle_new_order(self, callback: CallbackQuery, state: FSMContext):
         """Handle new order creation"""
-        try:
-            await callback.answer()
-            
-            user = await self._get_user_data(callback.from_user)
-            lang = user.get('language', 'en')
-            
-            text = get_text(lang, 'order_flow.service_selection')
-            
-            await callback.message.edit_text(
-                text,
-                reply_markup=get_services_keyboard(lang),
-                parse_mode="Markdown"
-            )
-            
-        except Exception as e:
-            logger.error(f"Error in new order handler: {e}")
-            await callback.answer("❌ Error occurred")
+        await callback.answer()
+        
+        user = await self._get_user_data(callback.from_user)
+        lang = user.get('language', 'en')
+        
+        text = get_text(lang, 'order_flow.service_selection')
+        
+        await callback.message.edit_text(
+            text,
+            reply_markup=get_services_keyboard(lang)
+        )
     
-    async def handle_service_selection(self, callback: CallbackQuery, state: FSMContext):
+    async def handle_service_selection(self, callback: CallbackQuery, service_type: str, state: FSMContext):
         """Handle service type selection"""
-        try:
-            await callback.answer()
-            
-            user = await self._get_user_data(callback.from_user)
-            lang = user.get('language', 'en')
-            
-            service_type = callback.data.replace("service_", "")
-            await state.update_data(service_type=service_type, language=lang)
-            
-            service_name = get_text(lang, f'services.{service_type}')
-            text = get_text(lang, 'order_flow.subject_prompt', service=service_name)
-            
-            await callback.message.edit_text(text, parse_mode="Markdown")
-            await state.set_state(OrderStates.subject)
-            
-        except Exception as e:
-            logger.error(f"Error in service selection: {e}")
-            await callback.answer("❌ Error occurred")
+        await callback.answer()
+        
+        user = await self._get_user_data(callback.from_user)
+        lang = user.get('language', 'en')
+        
+        await state.update_data(service_type=service_type, language=lang)
+        
+        service_name = get_text(lang, f'services.{service_type}')
+        text = get_text(lang, 'order_flow.subject_prompt', service=service_name)
+        
+        await callback.message.edit_text(text)
+        await state.set_state(OrderStates.subject)
     
     async def handle_subject_input(self, message: Message, state: FSMContext):
         """Handle subject input"""
-        try:
-            data = await state.get_data()
-            lang = data.get('language', 'en')
-            
-            subject = message.text.strip()
-            
-            if len(subject) < 5:
-                await message.answer(get_text(lang, 'errors.subject_short'))
-                return
-            
-            await state.update_data(subject=subject)
-            
-            text = get_text(lang, 'order_flow.requirements_prompt')
-            await message.answer(text, parse_mode="Markdown")
-            await state.set_state(OrderStates.requirements)
-            
-        except Exception as e:
-            logger.error(f"Error in subject input: {e}")
-            await message.answer("❌ An error occurred. Please try again.")
+        data = await state.get_data()
+        lang = data.get('language', 'en')
+        
+        subject = message.text.strip()
+        
+        if len(subject) < 5:
+            await message.answer(get_text(lang, 'errors.subject_short'))
+            return
+        
+        await state.update_data(subject=subject)
+        
+        text = get_text(lang, 'order_flow.requirements_prompt')
+        await message.answer(text)
+        await state.set_state(OrderStates.requirements)
     
     async def handle_requirements_input(self, message: Message, state: FSMContext):
         """Handle requirements input"""
-        try:
-            data = await state.get_data()
-            lang = data.get('language', 'en')
-            
-            requirements = message.text.strip()
-            
-            if len(requirements) < 20:
-                await message.answer(get_text(lang, 'errors.requirements_short'))
-                return
-            
-            await state.update_data(requirements=requirements)
-            
-            text = get_text(lang, 'order_flow.academic_level_prompt')
-            await message.answer(
-                text,
-                reply_markup=get_academic_level_keyboard(lang),
-                parse_mode="Markdown"
-            )
-            
-        except Exception as e:
-            logger.error(f"Error in requirements input: {e}")
-            await message.answer("❌ An error occurred. Please try again.")
+        data = await state.get_data()
+        lang = data.get('language', 'en')
+        
+        requirements = message.text.strip()
+        
+        if len(requirements) < 20:
+            await message.answer(get_text(lang, 'errors.requirements_short'))
+            return
+        
+        await state.update_data(requirements=requirements)
+        
+        text = get_text(lang, 'order_flow.academic_level_prompt')
+        await message.answer(
+            text,
+            reply_markup=get_academic_level_keyboard(lang)
+        )
     
-    async def handle_academic_level(self, callback: CallbackQuery, state: FSMContext):
+    async def handle_academic_level(self, callback: CallbackQuery, academic_level: str, state: FSMContext):
         """Handle academic level selection"""
-        try:
-            await callback.answer()
-            
-            data = await state.get_data()
-            lang = data.get('language', 'en')
-            
-            academic_level = callback.data.replace("level_", "")
-            await state.update_data(academic_level=academic_level)
-            
-            text = get_text(lang, 'order_flow.deadline_prompt')
-            await callback.message.edit_text(text, parse_mode="Markdown")
-            await state.set_state(OrderStates.deadline)
-            
-        except Exception as e:
-            logger.error(f"Error in academic level selection: {e}")
-            await callback.answer("❌ Error occurred")
+        await callback.answer()
+        
+        data = await state.get_data()
+        lang = data.get('language', 'en')
+        
+        await state.update_data(academic_level=academic_level)
+        
+        text = get_text(lang, 'order_flow.deadline_prompt')
+        await callback.message.edit_text(text)
+        await state.set_state(OrderStates.deadline)
     
     async def handle_deadline_input(self, message: Message, state: FSMContext):
         """Handle deadline input"""
+        data = await state.get_data()
+        lang = data.get('language', 'en')
+        
+        deadline_text = message.text.strip()
+        deadline = None
+        
+        # Parse different deadline formats
         try:
-            data = await state.get_data()
-            lang = data.get('language', 'en')
-            
-            deadline_text = message.text.strip().lower()
-            deadline = None
-            
-            # Parse different deadline formats
-            try:
-                if "hour" in deadline_text:
-                    hours = int(deadline_text.split()[0])
-                    deadline = datetime.now() + timedelta(hours=hours)
-                elif "day" in deadline_text:
-                    days = int(deadline_text.split()[0])
-                    deadline = datetime.now() + timedelta(days=days)
+            duration = DEADLINE_DURATION_RE.match(deadline_text)
+            date_match = None if duration else DEADLINE_DATE_RE.match(deadline_text)
+            
+            if duration:
+                amount, unit = int(duration.group(1)), duration.group(2).lower()
+                delta = timedelta(hours=amount) if unit == "hour" else timedelta(days=amount)
+                deadline = datetime.now() + delta
+            elif date_match:
+                year, month, day, hour, minute = date_match.groups()
+                if hour is None:  # Date only: end of that day
+                    deadline = datetime(int(year), int(month), int(day), 23, 59)
                 else:
-                    # Try to parse as date/datetime
-                    if len(deadline_text) == 10:  # Date only
-                        deadline = datetime.strptime(deadline_text, "%Y-%m-%d").replace(hour=23, minute=59)
-                    else:  # Date and time
-                        deadline = datetime.strptime(deadline_text, "%Y-%m-%d %H:%M")
-                
-                # Validate deadline is in the future
-                if deadline <= datetime.now():
-                    await message.answer(get_text(lang, 'errors.deadline_future'))
-                    return
-                
-            except (ValueError, IndexError):
-                await message.answer(get_text(lang, 'errors.deadline_format'))
-                return
-            
-            await state.update_data(deadline=deadline)
+                    deadline = datetime(int(year), int(month), int(day), int(hour), int(minute))
+            else:
+                raise ValueError(f"Unrecognised deadline: {deadline_text}")
             
-            text = get_text(lang, 'order_flow.currency_prompt')
-            await message.answer(
-                text,
-                reply_markup=get_currency_keyboard(lang),
-                parse_mode="Markdown"
-            )
+            # Validate deadline is in the future
+            if deadline <= datetime.now():
+                await message.answer(get_text(lang, 'errors.deadline_future'))
+                return
             
-        except Exception as e:
-            logger.error(f"Error in deadline input: {e}")
-            await message.answer("❌ An error occurred. Please try again.")
+        except (ValueError, OverflowError):
+            await message.answer(get_text(lang, 'errors.deadline_format'))
+            return
+        
+        await state.update_data(deadline=deadline.isoformat())
+        
+        text = get_text(lang, 'order_flow.currency_prompt')
+        await message.answer(
+            text,
+            reply_markup=get_currency_keyboard(lang)
+        )
     
-    async def handle_currency_selection(self, callback: CallbackQuery, state: FSMContext):
+    async def handle_currency_selection(self, callback: CallbackQuery, currency: str, state: FSMContext):
         """Handle currency selection"""
+        await callback.answer()
+        
+        data = await state.get_data()
+        lang = data.get('language', 'en')
+        
+        await state.update_data(currency=currency)
+        deadline = datetime.fromisoformat(data['deadline'])
+        
+        # Calculate pricing
         try:
-            await callback.answer()
+            # Calculate days until deadline
+            days_until_deadline = max(1, (deadline - datetime.now()).days)
+            
+            pricing = self.pricing_service.calculate_price(
+                service_type=data['service_type'],
+                academic_level=data['academic_level'],
+                days_until_deadline=days_until_deadline,
+                currency=currency
+            )
             
-            data = await state.get_data()
-            lang = data.get('language', 'en')
+            await state.update_data(pricing=pricing)
+            
+            # Show order summary
+            service_name = get_text(lang, f"services.{data['service_type']}")
+            level_name = get_text(lang, f"academic_levels.{data['academic_level']}")
+            
+            summary_text = get_text(lang, 'order_flow.notes_prompt',
+                service=service_name,
+                subject=escape_md(data['subject']),
+                level=level_name,
+                deadline=deadline.strftime('%Y-%m-%d %H:%M'),
+                base_price=pricing['base_price'],
+                currency=currency,
+                academic_multiplier=pricing['academic_multiplier'],
+                urgency_multiplier=pricing['urgency_multiplier'],
+                total_price=pricing['total_price']
+            )
             
-            currency = callback.data.replace("currency_", "")
-            await state.update_data(currency=currency)
+            await callback.message.edit_text(summary_text)
+            await state.set_state(OrderStates.special_notes)
             
-            # Calculate pricing
+        except (KeyError, ValueError, TelegramAPIError):
+            logger.exception("Error calculating pricing")
+            await callback.answer("❌ Error calculating price. Please try again.")
+
+    async def handle_special_notes(self, message: Message, state: FSMContext):
+        """Handle special notes input"""
+        data = await state.get_data()
+        lang = data.get('language', 'en')
+        
+        notes = message.text.strip() if message.text.strip().lower() != "skip" else None
+        await state.update_data(special_notes=notes)
+        
+        # Create order
+        user = await self._get_user_data(message.from_user)
+        
+        async with DatabaseManager.get_session() as db:
             try:
-                # Calculate days until deadline
-                days_until_deadline = max(1, (data['deadline'] - datetime.now()).days)
+                # Commit the counter bump on its own so the day's counter row
+                # is not locked for the rest of the order insert
+                order_number = await DatabaseManager.next_order_number(db)
+                await db.commit()
                 
-                pricing = self.pricing_service.calculate_price(
+                # Create order
+                order = Order(
+                    order_number=order_number,
+                    user_id=user['id'],
                     service_type=data['service_type'],
-                    academic_level=data['academic_level'],
-                    days_until_deadline=days_until_deadline,
-                    currency=currency
-                )
-                
-                await state.update_data(pricing=pricing)
-                
-                # Show order summary
-                service_name = get_text(lang, f"services.{data['service_type']}")
-                level_name = get_text(lang, f"academic_levels.{data['academic_level']}")
-                
-                summary_text = get_text(lang, 'order_flow.notes_prompt',
-                    service=service_name,
                     subject=data['subject'],
-                    level=level_name,
-                    deadline=data['deadline'].strftime('%Y-%m-%d %H:%M'),
-                    base_price=pricing['base_price'],
-                    currency=currency,
-                    academic_multiplier=pricing['academic_multiplier'],
-                    urgency_multiplier=pricing['urgency_multiplier'],
-                    total_price=pricing['total_price']
+                    requirements=data['requirements'],
+                    special_notes=notes,
+                    deadline=datetime.fromisoformat(data['deadline']),
+                    academic_level=data['academic_level'],
+                    base_price=data['pricing']['base_price'],
+                    urgency_multiplier=data['pricing']['urgency_multiplier'],
+                    total_amount=data['pricing']['total_price'],
+                    currency=data['currency'],
+                    status='pending',
+                    payment_status='pending'
                 )
                 
-                await callback.message.edit_text(summary_text, parse_mode="Markdown")
-                await state.set_state(OrderStates.special_notes)
-                
-            except Exception as e:
-                logger.error(f"Error calculating pricing: {e}")
-                await callback.answer("❌ Error calculating price. Please try again.")
-                
-        except Exception as e:
-            logger.error(f"Error in currency selection: {e}")
-            await callback.answer("❌ Error occurred")
-
-    async def handle_special_notes(self, message: Message, state: FSMContext):
-        """Handle special notes input"""
-        try:
-            data = await state.get_data()
-            lang = data.get('language', 'en')
-            
-            notes = message.text.strip() if message.text.strip().lower() != "skip" else None
-            await state.update_data(special_notes=notes)
-            
-            # Create order
-            user = await self._get_user_data(message.from_user)
-            
-            with DatabaseManager.get_session() as db:
-                try:
-                    # Generate order number
-                    order_count = db.query(Order).count()
-                    order_number = f"SS{datetime.now().strftime('%Y%m%d')}{order_count + 1:04d}"
-                    
-                    # Create order
-                    order = Order(
-                        order_number=order_number,
-                        user_id=user['id'],
-                        service_type=data['service_type'],
-                        subject=data['subject'],
-                        requirements=data['requirements'],
-                        special_notes=notes,
-                        deadline=data['deadline'],
-                        academic_level=data['academic_level'],
-                        base_price=data['pricing']['base_price'],
-                        urgency_multiplier=data['pricing']['urgency_multiplier'],
-                        total_amount=data['pricing']['total_price'],
-                        currency=data['currency'],
-                        status='pending',
-                        payment_status='pending'
-                    )
-                    
-                    db.add(order)
-                    db.commit()
-                    db.refresh(order)
-                    
-                    # Show payment options
-                    payment_text = get_text(lang, 'order_flow.order_created',
-                        order_number=order.order_number,
-                        total=order.total_amount,
-                        currency=order.currency
-                    )
-                    
-                    await message.answer(
-                        payment_text,
-                        reply_markup=get_payment_keyboard(lang),
-                        parse_mode="Markdown"
-                    )
-                    
-                    await state.clear()
-                    
-                    logger.info(f"Order {order.order_number} created successfully")
-                    
-                except Exception as e:
-                    logger.error(f"Error creating order: {e}")
-                    await message.answer(get_text(lang, 'errors.general'))
+                db.add(order)
+                await db.commit()
                 
-        except Exception as e:
-            logger.error(f"Error in special notes handler: {e}")
-            await message.answer("❌ An error occurred. Please try again.")
+            except SQLAlchemyError:
+                logger.exception("Error creating order")
+                await message.answer(get_text(lang, 'errors.general'))
+                return
+        
+        logger.info(f"Order {order.order_number} created successfully")
+        
+        # Show payment options once the order is committed and the session released
+        payment_text = get_text(lang, 'order_flow.order_created',
+            order_number=order.order_number,
+            total=order.total_amount,
+            currency=order.currency
+        )
+        
+        await message.answer(
+            payment_text,
+            reply_markup=get_payment_keyboard(lang)
+        )
+        
+        await state.clear()
     
-    async def handle_payment_method(self, callback: CallbackQuery):
+    async def handle_payment_method(self, callback: CallbackQuery, method: str, state: FSMContext):
         """Handle payment method selection"""
-        try:
-            await callback.answer()
-            
-            user = await self._get_user_data(callback.from_user)
-            lang = user.get('language', 'en')
-            
-            method = callback.data.replace("pay_", "")
-            
-            if method == "stripe":
-                if lang == 'ar':
-                    text = """💳 **الدفع بالبطاقة الائتمانية**
-
-سيتم توجيهك إلى صفحة الدفع الآمنة عبر Stripe.
-
-هذه الميزة قيد الإعداد حالياً. يرجى التواصل مع الدعم للمساعدة في الدفع."""
-                else:
-                    text = """💳 **Credit/Debit Card Payment**
-
-You will be redirected to our secure Stripe payment page.
-
-This feature is currently being set up. Please contact support for payment assistance."""
-                    
-            elif method == "bank":
-                if lang == 'ar':
-                    text = """🏦 **الدفع عبر التحويل البنكي**
-
-**تفاصيل البنك:**
-🏛️ البنك: بنك الإمارات دبي الوطني
-👤 اسم الحساب: Student Services
-🔢 رقم الحساب: 1234567890
-🌐 IBAN: AE07 0331 2345 6789 0123 456
-📧 SWIFT: EBILAEAD
-
-**التعليمات:**
-1. حول المبلغ الدقيق إلى الحساب أعلاه
-2. أرسل لنا إيصال التحويل عبر الدعم
-3. سنتحقق من دفعتك خلال 24 ساعة
-
-⚠️ **مهم:** اذكر رقم طلبك في مرجع التحويل"""
-                else:
-                    text = """🏦 **Bank Transfer Payment**
-
-**Bank Details:**
-🏛️ Bank: Emirates NBD
-👤 Account Name: Student Services
-🔢 Account Number: 1234567890
-🌐 IBAN: AE07 0331 2345 6789 0123 456
-📧 SWIFT: EBILAEAD
-
-**Instructions:**
-1. Transfer the exact amount to the above account
-2. Send us the receipt via support
-3. We'll verify your payment within 24 hours
-
-⚠️ **Important:** Include your order number in the transfer reference"""
-            else:
-                text = "❌ Unknown payment method selected."
-            
-            await callback.message.edit_text(
-                text,
-                reply_markup=get_main_menu_keyboard(lang),
-                parse_mode="Markdown"
-            )
-            
-        except Exception as e:
-            logger.error(f"Error in payment method handler: {e}")
-            await callback.answer("❌ Error occurred")
+        await callback.answer()
+        
+        user = await self._get_user_data(callback.from_user)
+        lang = user.get('language', 'en')
+        
+        if method == "stripe":
+            text = get_text(lang, 'payment_details.stripe')
+        elif method == "bank":
+            text = get_text(lang, 'payment_details.bank')
+        else:
+            text = "❌ Unknown payment method selected."
+        
+        await callback.message.edit_text(
+            text,
+            reply_markup=get_main_menu_keyboard(lang)
+        )
     
     async def handle_my_orders(self, callback: CallbackQuery):
         """Handle my orders view"""
-        try:
-            await callback.answer()
-            
-            user = await self._get_user_data(callback.from_user)
-            lang = user.get('language', 'en')
-            
-            with DatabaseManager.get_session() as db:
-                orders = db.query(Order).filter(Order.user_id == user['id']).order_by(Order.created_at.desc()).limit(5).all()
-                
-                if not orders:
-                    if lang == 'ar':
-                        text = "📋 **طلباتك**\n\nلم تقم بوضع أي طلبات بعد.\n\nانقر على 'طلب جديد' للبدء!"
-                    else:
-                        text = "📋 **Your Orders**\n\nYou haven't placed any orders yet.\n\nClick 'New Order' to get started!"
-                        
-                    await callback.message.edit_text(
-                        text,
-                        reply_markup=get_main_menu_keyboard(lang),
-                        parse_mode="Markdown"
-                    )
-                    return
-                
-                if lang == 'ar':
-                    orders_text = "📋 **طلباتك الأخيرة:**\n\n"
-                else:
-                    orders_text = "📋 **Your Recent Orders:**\n\n"
-                
-                for order in orders:
-                    status_emoji = {
-                        'pending': '⏳',
-                        'confirmed': '✅',
-                        'in_progress': '🔄',
-                        'delivered': '📦',
-                        'completed': '✅',
-                        'cancelled': '❌'
-                    }.get(order.status, '❓')
-                    
-                    orders_text += f"{status_emoji} **#{order.order_number}** - {order.subject[:30]}...\n"
-                
-                await callback.message.edit_text(
-                    orders_text,
-                    reply_markup=get_main_menu_keyboard(lang),
-                    parse_mode="Markdown"
-                )
+        await callback.answer()
+        
+        user = await self._get_user_data(callback.from_user)
+        lang = user.get('language', 'en')
+        
+        async with DatabaseManager.get_session() as db:
+            # Only the rendered columns; plain rows skip ORM hydration.
+            # Rows are fetched here so the connection is released before replying.
+            orders = (await db.execute(recent_orders_stmt(user['id']))).all()
+        
+        if not orders:
+            text = get_text(lang, 'orders.empty')
                 
-        except Exception as e:
-            logger.error(f"Error in my orders handler: {e}")
-            await callback.answer("❌ Error occurred")
-    
-    async def handle_contact_support(self, callback: CallbackQuery):
-        """Handle support request"""
-        try:
-            await callback.answer()
-            
-            user = await self._get_user_data(callback.from_user)
-            lang = user.get('language', 'en')
-            
-            if lang == 'ar':
-                support_text = """🆘 **الدعم والمساعدة**
-
-**معلومات التواصل:**
-📧 البريد الإلكتروني: support@studentservices.com
-💬 تليجرام: متاح 24/7
-
-**المشاكل الشائعة:**
-• مشاكل الدفع
-• تعديل الطلبات
-• الدعم التقني
-• استفسارات عامة
-
-**وقت الاستجابة:**
-🕐 عادة خلال 2-4 ساعات
-⚡ المشاكل العاجلة: تواصل فوراً
-
-كيف يمكننا مساعدتك اليوم؟"""
-            else:
-                support_text = """🆘 **Support & Help**
-
-**Contact Information:**
-📧 Email: support@studentservices.com
-💬 Telegram: Available 24/7
-
-**Common Issues:**
-• Payment problems
-• Order modifications
-• Technical support
-• General inquiries
-
-**Response Time:**
-🕐 Usually within 2-4 hours
-⚡ Urgent issues: Contact immediately
-
-How can we help you today?"""
-            
             await callback.message.edit_text(
-                support_text,
-                reply_markup=get_main_menu_keyboard(lang),
-                parse_mode="Markdown"
+                text,
+                reply_markup=get_main_menu_keyboard(lang)
             )
+            return
+        
+        parts = [get_text(lang, 'orders.recent_header')]
+        
+        for order in orders:
+            status_emoji = STATUS_EMOJI.get(order.status, '❓')
             
-        except Exception as e:
-            logger.error(f"Error in support handler: {e}")
-            await callback.answer("❌ Error occurred")
+            parts.append(f"{status_emoji} **#{order.order_number}** - {escape_md(order.subject[:30])}...\n")
+        
+        orders_text = "".join(parts)
+        
+        await callback.message.edit_text(
+            orders_text,
+            reply_markup=get_main_menu_keyboard(lang)
+        )
+    
+    async def handle_contact_support(self, callback: CallbackQuery):
+        """Handle support request"""
+        await callback.answer()
+        
+        user = await self._get_user_data(callback.from_user)
+        lang = user.get('language', 'en')
+        
+        support_text = get_text(lang, 'info.support')
+        
+        await callback.message.edit_text(
+            support_text,
+            reply_markup=get_main_menu_keyboard(lang)
+        )
     
     async def handle_help(self, callback: CallbackQuery):
         """Handle help request"""
-        try:
-            await callback.answer()
-            
-            user = await self._get_user_data(callback.from_user)
-            lang = user.get('language', 'en')
-            
-            if lang == 'ar':
-                help_text = """ℹ️ **المساعدة والمعلومات**
-
-**كيفية وضع طلب:**
-1️⃣ انقر على "📝 طلب جديد"
-2️⃣ اختر نوع الخدمة
-3️⃣ املأ المتطلبات
-4️⃣ اختر طريقة الدفع
-5️⃣ أكمل الدفع
-
-**الخدمات المتاحة:**
-📝 الواجبات والمقالات
-💻 المشاريع التقنية
-📊 العروض التقديمية
-🔄 خدمات إعادة التصميم
-📚 ملخصات المقررات
-⚡ الخدمات السريعة (24 ساعة)
-
-**طرق الدفع:**
-💳 البطاقة الائتمانية (Stripe)
-🏦 التحويل البنكي
-
-تحتاج مساعدة أكثر؟ تواصل مع فريق الدعم!"""
-            else:
-                help_text = """ℹ️ **Help & Information**
-
-**How to place an order:**
-1️⃣ Click "📝 New Order"
-2️⃣ Select service type
-3️⃣ Fill in requirements
-4️⃣ Choose payment method
-5️⃣ Complete payment
-
-**Available Services:**
-📝 Assignments & Essays
-💻 IT Projects
-📊 Presentations
-🔄 Redesign Services
-📚 Course Summaries
-⚡ Express Services (24h)
-
-**Payment Methods:**
-💳 Credit/Debit Card (Stripe)
-🏦 Bank Transfer
-
-Need more help? Contact our support team!"""
-            
-            await callback.message.edit_text(
-                help_text,
-                reply_markup=get_main_menu_keyboard(lang),
-                parse_mode="Markdown"
-            )
-            
-        except Exception as e:
-            logger.error(f"Error in help handler: {e}")
-            await callback.answer("❌ Error occurred")
+        await callback.answer()
+        
+        user = await self._get_user_data(callback.from_user)
+        lang = user.get('language', 'en')
+        
+        help_text = get_text(lang, 'info.help')
+        
+        await callback.message.edit_text(
+            help_text,
+            reply_markup=get_main_menu_keyboard(lang)
+        )
     
     async def cmd_help(self, message: Message):
         """Handle /help command"""
-        try:
-            user = await self._get_user_data(message.from_user)
-            lang = user.get('language', 'en') if user else 'en'
-            
-            if lang == 'ar':
-                help_text = """🆘 **المساعدة والدعم**
-
-**الأوامر المتاحة:**
-/start - بدء البوت وعرض القائمة الرئيسية
-/orders - عرض طلباتك
-/cancel - إلغاء العملية الحالية
-/help - عرض رسالة المساعدة هذه
-
-**كيفية وضع طلب:**
-1️⃣ انقر على "📝 طلب جديد"
-2️⃣ اختر نوع الخدمة
-3️⃣ املأ المتطلبات
-4️⃣ اختر طريقة الدفع
-5️⃣ أكمل الدفع
-
-**طرق الدفع:**
-💳 البطاقة الائتمانية (فوري)
-🏦 التحويل البنكي (تحقق خلال 24 ساعة)
-
-**الدعم:**
-📧 البريد الإلكتروني: support@studentservices.com
-
-**ساعات العمل:**
-🕐 دعم متاح 24/7"""
-            else:
-                help_text = """🆘 **Help & Support**
-
-**Available Commands:**
-/start - Start the bot and show main menu
-/orders - View your orders
-/cancel - Cancel current operation
-/help - Show this help message
-
-**How to place an order:**
-1️⃣ Click "📝 New Order"
-2️⃣ Select service type
-3️⃣ Fill in requirements
-4️⃣ Choose payment method
-5️⃣ Complete payment
-
-**Payment Methods:**
-💳 Credit/Debit Card (Instant)
-🏦 Bank Transfer (24h verification)
-
-**Support:**
-📧 Email: support@studentservices.com
-
-**Business Hours:**
-🕐 24/7 Support Available"""
-            
-            await message.answer(help_text, parse_mode="Markdown")
-            
-        except Exception as e:
-            logger.error(f"Error in help command: {e}")
-            await message.answer("❌ An error occurred. Please try again.")
+        user = await self._get_user_data(message.from_user)
+        lang = user.get('language', 'en') if user else 'en'
+        
+        help_text = get_text(lang, 'info.commands_help')
+        
+        await message.answer(help_text)
 
     async def cmd_orders(self, message: Message):
         """Handle /orders command"""
-        try:
-            user = await self._get_user_data(message.from_user)
+        user = await self._get_user_data(message.from_user)
+        
+        if not user:
+            await message.answer("Please start the bot first with /start")
+            return
             
-            if not user:
-                await message.answer("Please start the bot first with /start")
-                return
+        lang = user.get('language', 'en')
+        
+        async with DatabaseManager.get_session() as db:
+            # Only the rendered columns; plain rows skip ORM hydration.
+            # Rows are fetched here so the connection is released before replying.
+            orders = (await db.execute(order_history_stmt(user['id']))).all()
+        
+        if not orders:
+            text = get_text(lang, 'orders.empty')
                 
-            lang = user.get('language', 'en')
+            await message.answer(
+                text,
+                reply_markup=get_main_menu_keyboard(lang)
+            )
+            return
+        
+        parts = [get_text(lang, 'orders.recent_header')]
+        
+        for order in orders:
+            status_emoji = STATUS_EMOJI.get(order.status, '❓')
             
-            with DatabaseManager.get_session() as db:
-                orders = db.query(Order).filter(Order.user_id == user['id']).order_by(Order.created_at.desc()).limit(10).all()
-                
-                if not orders:
-                    if lang == 'ar':
-                        text = "📋 **طلباتك**\n\nلم تقم بوضع أي طلبات بعد.\n\nانقر على 'طلب جديد' للبدء!"
-                    else:
-                        text = "📋 **Your Orders**\n\nYou haven't placed any orders yet.\n\nClick 'New Order' to get started!"
-                        
-                    await message.answer(
-                        text,
-                        reply_markup=get_main_menu_keyboard(lang),
-                        parse_mode="Markdown"
-                    )
-                    return
-                
-                if lang == 'ar':
-                    orders_text = "📋 **طلباتك الأخيرة:**\n\n"
-                else:
-                    orders_text = "📋 **Your Recent Orders:**\n\n"
-                
-                for order in orders:
-                    status_emoji = {
-                        'pending': '⏳',
-                        'confirmed': '✅',
-                        'in_progress': '🔄',
-                        'delivered': '📦',
-                        'completed': '✅',
-                        'cancelled': '❌'
-                    }.get(order.status, '❓')
-                    
-                    orders_text += f"""
+            parts.append(f"""
 {status_emoji} **Order #{order.order_number}**
-📝 {order.service_type.title()} - {order.subject}
+📝 {order.service_type.title()} - {escape_md(order.subject)}
 💰 {order.total_amount} {order.currency}
 📅 Created: {order.created_at.strftime('%Y-%m-%d %H:%M')}
 
-"""
-                
-                await message.answer(
-                    orders_text,
-                    reply_markup=get_main_menu_keyboard(lang),
-                    parse_mode="Markdown"
-                )
-                
-        except Exception as e:
-            logger.error(f"Error in orders command: {e}")
-            await message.answer("❌ Error fetching your orders. Please try again.")
+""")
+        
+        orders_text = "".join(parts)
+        
+        await message.answer(
+            orders_text,
+            reply_markup=get_main_menu_keyboard(lang)
+        )
     
     async def cmd_cancel(self, message: Message, state: FSMContext):
         """Handle /cancel command"""
-        try:
-            user = await self._get_user_data(message.from_user)
-            lang = user.get('language', 'en') if user else 'en'
-            
-            await state.clear()
+        user = await self._get_user_data(message.from_user)
+        lang = user.get('language', 'en') if user else 'en'
+        
+        await state.clear()
+        
+        text = get_text(lang, 'info.cancelled')
             
-            if lang == 'ar':
-                text = "❌ **تم إلغاء العملية**\n\nالعودة إلى القائمة الرئيسية..."
-            else:
-                text = "❌ **Operation Cancelled**\n\nReturning to main menu..."
-                
-            await message.answer(
-                text,
-                reply_markup=get_main_menu_keyboard(lang),
-                parse_mode="Markdown"
-            )
-        except Exception as e:
-            logger.error(f"Error in cancel command: {e}")
-            await message.answer("❌ An error occurred.")
+        await message.answer(
+            text,
+            reply_markup=get_main_menu_keyboard(lang)
+        )
     
     async def handle_feedback_rating(self, message: Message, state: FSMContext):
         """Handle feedback rating input"""
+        user = await self._get_user_data(message.from_user)
+        lang = user.get('language', 'en')
+        
         try:
-            user = await self._get_user_data(message.from_user)
-            lang = user.get('language', 'en')
-            
-            try:
-                rating = int(message.text.strip())
-                if rating < 1 or rating > 5:
-                    raise ValueError("Rating out of range")
-            except ValueError:
-                if lang == 'ar':
-                    await message.answer("❌ يرجى إرسال تقييم صحيح من 1 إلى 5.")
-                else:
-                    await message.answer("❌ Please send a valid rating from 1 to 5.")
-                return
-            
-            await state.update_data(rating=rating)
-            
-            stars = "⭐" * rating
-            
-            if lang == 'ar':
-                text = f"""
-{stars} **شكراً لك على تقييمك!**
-
-هل تريد إضافة أي تعليقات؟ (اختياري)
-
-أرسل تعليقاتك أو اكتب "skip" للانتهاء:
-                """
-            else:
-                text = f"""
-{stars} **Thank you for your rating!**
-
-Would you like to add any comments? (Optional)
-
-Send your comments or type "skip" to finish:
-                """
-            
-            await message.answer(text, parse_mode="Markdown")
-            await state.set_state(FeedbackStates.comment)
-            
-        except Exception as e:
-            logger.error(f"Error in feedback rating handler: {e}")
-            await message.answer("❌ An error occurred. Please try again.")
+            rating = int(message.text.strip())
+            if rating < 1 or rating > 5:
+                raise ValueError("Rating out of range")
+        except ValueError:
+            await message.answer(get_text(lang, 'feedback.invalid_rating'))
+            return
+        
+        await state.update_data(rating=rating)
+        
+        text = get_text(lang, 'feedback.rating_received', stars="⭐" * rating)
+        
+        await message.answer(text)
+        await state.set_state(FeedbackStates.comment)
     
     async def handle_feedback_comment(self, message: Message, state: FSMContext):
         """Handle feedback comment input"""
-        try:
-            user = await self._get_user_data(message.from_user)
-            lang = user.get('language', 'en')
-            
-            comment = message.text.strip() if message.text.strip().lower() != "skip" else None
-            data = await state.get_data()
-            
-            with DatabaseManager.get_session() as db:
-                try:
-                    # Create feedback record
-                    feedback = Feedback(
-                        user_id=user['id'],
-                        rating=data['rating'],
-                        comment=comment,
-                        created_at=datetime.utcnow()
-                    )
-                    
-                    db.add(feedback)
-                    db.commit()
-                    
-                    stars = "⭐" * data['rating']
-                    
-                    if lang == 'ar':
-                        text = f"""
-✅ **تم إرسال التقييم!**
-
-{stars} التقييم: {data['rating']}/5
-
-شكراً لك لمساعدتنا في تحسين خدمتنا!
-                        """
-                    else:
-                        text = f"""
-✅ **Feedback Submitted!**
-
-{stars} Rating: {data['rating']}/5
-
-Thank you for helping us improve our service!
-                        """
-                    
-                    await message.answer(
-                        text,
-                        reply_markup=get_main_menu_keyboard(lang),
-                        parse_mode="Markdown"
-                    )
-                    
-                    await state.clear()
-                    
-                except Exception as e:
-                    logger.error(f"Error saving feedback: {e}")
-                    await message.answer(get_text(lang, 'errors.general'))
+        user = await self._get_user_data(message.from_user)
+        lang = user.get('language', 'en')
+        
+        comment = message.text.strip() if message.text.strip().lower() != "skip" else None
+        data = await state.get_data()
+        
+        async with DatabaseManager.get_session() as db:
+            try:
+                # Create feedback record
+                feedback = Feedback(
+                    user_id=user['id'],
+                    rating=data['rating'],
+                    comment=comment,
+                    created_at=datetime.utcnow()
+                )
                 
-        except Exception as e:
-            logger.error(f"Error in feedback comment handler: {e}")
-            await message.answer("❌ An error occurred. Please try again.")
+                db.add(feedback)
+                await db.commit()
+                
+            except SQLAlchemyError:
+                logger.exception("Error saving feedback")
+                await message.answer(get_text(lang, 'errors.general'))
+                return
+        
+        # Reply once the session has been released
+        text = get_text(
+            lang, 'feedback.submitted',
+            stars="⭐" * data['rating'], rating=data['rating']
+        )
+        
+        await message.answer(
+            text,
+            reply_markup=get_main_menu_keyboard(lang)
+        )
+        
+        await state.clear()
 
     async def handle_file_upload(self, message: Message):
         """Handle file uploads"""
-        try:
-            user = await self._get_user_data(message.from_user)
-            lang = user.get('language', 'en') if user else 'en'
-            
-            if not message.document:
-                if lang == 'ar':
-                    await message.answer("❌ يرجى إرسال ملف صحيح.")
-                else:
-                    await message.answer("❌ Please send a valid document file.")
-                return
-            
-            # File size check (20MB limit)
-            max_size = 20 * 1024 * 1024  # 20MB
-            if message.document.file_size > max_size:
-                if lang == 'ar':
-                    await message.answer("❌ الملف كبير جداً. الحد الأقصى 20 ميجابايت.")
-                else:
-                    await message.answer("❌ File too large. Maximum size is 20MB.")
-                return
-            
-            if lang == 'ar':
-                text = f"✅ تم استلام الملف: {message.document.file_name}\n\nمعالجة رفع الملفات قيد الإعداد. يرجى التواصل مع الدعم لإرسال الملفات."
-            else:
-                text = f"✅ File received: {message.document.file_name}\n\nFile upload processing is being set up. Please contact support for file submissions."
-            
-            await message.answer(text, parse_mode="Markdown")
-            
-        except Exception as e:
-            logger.error(f"Error handling file upload: {e}")
-            await message.answer("❌ Error processing file. Please try again.")
+        user = await self._get_user_data(message.from_user)
+        lang = user.get('language', 'en') if user else 'en'
+        
+        if not message.document:
+            await message.answer(get_text(lang, 'files.invalid'))
+            return
+        
+        # File size check (20MB limit)
+        max_size = 20 * 1024 * 1024  # 20MB
+        if message.document.file_size > max_size:
+            await message.answer(get_text(lang, 'files.too_large'))
+            return
+        
+        text = get_text(lang, 'files.received', file_name=escape_md(message.document.file_name or ''))
+        
+        await message.answer(text)
     
     async def _get_user_if_exists(self, telegram_user) -> Optional[Dict[str, Any]]:
         """Check if user exists and return user data"""
+        cached_user = _user_cache.get(telegram_user.id)
+        if cached_user:
+            return cached_user
+        
         try:
-            with DatabaseManager.get_session() as db:
-                user = db.query(User).filter(User.telegram_id == str(telegram_user.id)).first()
+            async with DatabaseManager.get_session() as db:
+                user = await db.scalar(user_by_telegram_id_stmt(str(telegram_user.id)))
                 
                 if user:
-                    return {
+                    user_data = {
                         'id': user.id,
                         'telegram_id': user.telegram_id,
                         'full_name': user.full_name,
                         'telegram_username': user.telegram_username,
                         'language': user.language
                     }
+                    _user_cache[telegram_user.id] = user_data
+                    return user_data
                 return None
-        except Exception as e:
-            logger.error(f"Error checking user existence: {e}")
+        except SQLAlchemyError:
+            logger.exception("Error checking user existence")
             return None
     
     async def _get_user_data(self, telegram_user) -> Dict[str, Any]:
         """Get existing user data"""
-        with DatabaseManager.get_session() as db:
-            user = db.query(User).filter(User.telegram_id == str(telegram_user.id)).first()
+        cached_user = _user_cache.get(telegram_user.id)
+        if cached_user:
+            return cached_user
+        
+        async with DatabaseManager.get_session() as db:
+            user = await db.scalar(user_by_telegram_id_stmt(str(telegram_user.id)))
             
             if user:
-                return {
+                user_data = {
                     'id': user.id,
                     'telegram_id': user.telegram_id,
                     'full_name': user.full_name,
                     'telegram_username': user.telegram_username,
                     'language': user.language
                 }
+                _user_cache[telegram_user.id] = user_data
+                return user_data
             else:
                 # Create user with default language if not exists
                 return await self._get_or_create_user(telegram_user, 'en')
     
     async def _get_or_create_user(self, telegram_user, language: str = 'en') -> Dict[str, Any]:
         """Get or create user from Telegram user data"""
-        with DatabaseManager.get_session() as db:
-            user = db.query(User).filter(User.telegram_id == str(telegram_user.id)).first()
+        now = datetime.utcnow()
+        full_name = f"{telegram_user.first_name} {telegram_user.last_name or ''}".strip()
+        
+        # Map currency based on language/region
+        currency_map = {
+            'ar': 'AED',  # Arabic users default to AED
+            'en': 'AED'   # AED as main currency for all
+        }
+        
+        async with DatabaseManager.get_session() as db:
+            # One round trip: insert a new user, or update language and last activity
+            stmt = DatabaseManager.upsert(db, User).values(
+                telegram_id=str(telegram_user.id),
+                telegram_username=telegram_user.username,
+                full_name=full_name,
+                language=language,
+                country="UAE" if language == 'ar' else "OTH",  # 3-character limit fix
+                currency=currency_map.get(language, 'AED'),
+                created_at=now,
+                last_activity=now,
+                updated_at=now
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[User.telegram_id],
+                set_={'language': language, 'last_activity': now, 'updated_at': now}
+            ).returning(
+                User.id, User.telegram_id, User.full_name, User.telegram_username,
+                User.language, User.created_at
+            )
             
-            if not user:
-                # Create new user
-                full_name = f"{telegram_user.first_name} {telegram_user.last_name or ''}".strip()
-                
-                # Map currency based on language/region
-                currency_map = {
-                    'ar': 'AED',  # Arabic users default to AED
-                    'en': 'AED'   # AED as main currency for all
-                }
-                
-                user = User(
-                    telegram_id=str(telegram_user.id),
-                    telegram_username=telegram_user.username,
-                    full_name=full_name,
-                    language=language,
-                    country="UAE" if language == 'ar' else "OTH",  # 3-character limit fix
-                    currency=currency_map.get(language, 'AED'),
-                    created_at=datetime.utcnow(),
-                    last_activity=datetime.utcnow()
-                )
-                db.add(user)
-                db.commit()
-                db.refresh(user)
-                
+            user = (await db.execute(stmt)).one()
+            await db.commit()
+            
+            # created_at only equals this call's timestamp when the row was inserted
+            if user.created_at == now:
                 logger.info(f"New user created: {full_name} (Language: {language})")
-            else:
-                # Update language and last activity
-                user.language = language
-                user.last_activity = datetime.utcnow()
-                db.commit()
             
             # Return user data as dict to avoid session issues
-            return {
+            user_data = {
                 'id': user.id,
                 'telegram_id': user.telegram_id,
                 'full_name': user.full_name,
                 'telegram_username': user.telegram_username,
                 'language': user.language
             }
+            _user_cache[telegram_user.id] = user_data
+            return user_data
     
-    async def error_handler(self, event, exception):
-        """Simple error handler"""
-        logger.error(f"Bot error: {exception}")
+    async def error_handler(self, event: ErrorEvent):
+        """Handle errors raised outside the handler middleware"""
+        logger.error(f"Bot error: {event.exception}", exc_info=event.exception)
+        
+        # Plain reply without a keyboard; the user's current menu stays usable
+        update = event.update
+        message = update.message or (update.callback_query.message if update.callback_query else None)
+        if not message:
+            return
         
-        # Try to send user-friendly error message
         try:
-            if hasattr(event, 'message') and event.message:
-                await event.message.answer(
-                    "❌ An unexpected error occurred. Please try again or contact support.\n❌ حدث خطأ غير متوقع. يرجى المحاولة مرة أخرى أو التواصل مع الدعم."
-                )
-        except Exception as send_error:
-            logger.error(f"Failed to send error message: {send_error}")
+            await message.answer(
+                "❌ An unexpected error occurred. Please try again or contact support.\n❌ حدث خطأ غير متوقع. يرجى المحاولة مرة أخرى أو التواصل مع الدعم."
+            )
+        except TelegramAPIError:
+            logger.debug("Failed to send error reply", exc_info=True)
     
     async def start_polling(self):
         """Start bot polling"""
         try:
             logger.info("Starting Telegram bot polling...")
-            await self.dp.start_polling(self.bot)
+            # Only ask Telegram for update types that have handlers registered
+            await self.dp.start_polling(
+                self.bot,
+                handle_as_tasks=True,
+                allowed_updates=self.dp.resolve_used_update_types()
+            )
         except Exception as e:
             logger.error(f"Error starting bot polling: {e}")
             raise
@@ -1397,6 +1552,8 @@ Thank you for helping us improve our service!
         try:
             if self.bot:
                 await self.bot.session.close()
+            await self.dp.storage.close()
+            await async_engine.dispose()
             logger.info("Telegram bot stopped successfully")
         except Exception as e:
             logger.error(f"Error stopping bot: {e}")
@@ -1443,6 +1600,13 @@ async def main():
             logger.error(f"Error during bot shutdown: {e}")
 
 if __name__ == "__main__":
+    # uvloop ships with uvicorn[standard]; fall back to the stock loop where it's missing (Windows)
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
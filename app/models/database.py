@@ -7,7 +7,8 @@ Production-ready database setup with connection pooling and error handling
 import logging
 import sys
 from pathlib import Path
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
@@ -30,6 +31,7 @@ if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},
+        query_cache_size=1200,
         echo=settings.debug
     )
 else:
@@ -37,16 +39,70 @@ else:
     engine = create_engine(
         DATABASE_URL,
         poolclass=QueuePool,
-        pool_size=10,
-        max_overflow=20,
+        pool_size=20,
+        max_overflow=10,
+        pool_timeout=30,
         pool_pre_ping=True,
-        pool_recycle=3600,
+        pool_recycle=1800,
+        pool_use_lifo=True,  # Reuse warm connections, let idle ones expire
+        query_cache_size=1200,  # Compiled statement cache shared by all sessions
+        connect_args={"connect_timeout": 5},  # Fail fast instead of hanging on an unreachable DB
         echo=settings.debug
     )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# -------------------------------------------------
+# Async Engine (Telegram bot)
+# -------------------------------------------------
+
+def _async_database_url(url: str) -> str:
+    """
+    Map a sync database URL onto its async driver
+    """
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgresql+psycopg2:"):
+        return url.replace("postgresql+psycopg2:", "postgresql+asyncpg:", 1)
+    if url.startswith(("sqlite+aiosqlite:", "postgresql+asyncpg:")):
+        return url
+    raise ValueError(
+        f"Unsupported DATABASE_URL scheme '{url.split(':', 1)[0]}': the async engine supports SQLite and PostgreSQL only"
+    )
+
+ASYNC_DATABASE_URL = _async_database_url(DATABASE_URL)
+
+# Async pool bounds; ASYNC_POOL_CAPACITY is the most connections handlers can hold at once
+ASYNC_POOL_SIZE = 10
+ASYNC_MAX_OVERFLOW = 20
+ASYNC_POOL_CAPACITY = ASYNC_POOL_SIZE + ASYNC_MAX_OVERFLOW
+
+if DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        query_cache_size=1200,
+        echo=settings.debug
+    )
+else:
+    # The engine owns the pool, so handlers reuse warm connections
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=ASYNC_POOL_SIZE,
+        max_overflow=ASYNC_MAX_OVERFLOW,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        query_cache_size=1200,
+        connect_args={"timeout": 5} if "+asyncpg" in ASYNC_DATABASE_URL else {},
+        echo=settings.debug
+    )
+
+# Objects stay usable after commit; handlers read them after the session closes
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -69,17 +125,44 @@ def get_db():
     finally:
         db.close()
 
+# Indexes removed from the models, dropped from databases created before the change
+RETIRED_INDEXES = {
+    "orders": ["idx_order_user"],  # prefix of idx_order_user_payment / idx_order_user_created
+}
+
+def sync_indexes():
+    """
+    Create declared indexes missing from existing tables and drop retired ones
+    (create_all only adds indexes together with a newly created table)
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name, index_names in RETIRED_INDEXES.items():
+            existing = {index["name"] for index in inspector.get_indexes(table_name)}
+            for index_name in index_names:
+                if index_name in existing:
+                    on_table = f" ON {table_name}" if DATABASE_URL.startswith("mysql") else ""
+                    conn.execute(text(f"DROP INDEX {index_name}{on_table}"))
+                    logger.info(f"Dropped retired index {index_name}")
+
 def init_database():
     """
     Initialize database and create all tables
     """
     try:
         # Import all models to ensure they are registered
-        from app.models.models import Order, User, Payment, Feedback
+        from app.models.models import Order, User, Payment, Feedback, OrderCounter
         
         # Create all tables
         Base.metadata.create_all(bind=engine)
         
+        # Bring indexes on pre-existing tables in line with the models
+        sync_indexes()
+        
         logger.info("Database initialized successfully")
         logger.info(f"Database URL: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'SQLite'}")
         
@@ -143,6 +226,8 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
         cursor.execute("PRAGMA temp_store=MEMORY")
         cursor.close()
 
+event.listen(async_engine.sync_engine, "connect", set_sqlite_pragma)
+
 @event.listens_for(engine, "checkout")
 def receive_checkout(dbapi_connection, connection_record, connection_proxy):
     """
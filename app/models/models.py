@@ -63,6 +63,7 @@ class User(Base):
         Index('idx_user_telegram', 'telegram_id'),
         Index('idx_user_email', 'email'),
         Index('idx_user_active', 'is_active'),
+        Index('idx_user_created', 'created_at'),
     )
     
     @validates('email')
@@ -158,9 +159,12 @@ class Order(Base):
     # Indexes
     __table_args__ = (
         Index('idx_order_number', 'order_number'),
-        Index('idx_order_user', 'user_id'),
         Index('idx_order_status', 'status'),
         Index('idx_order_payment_status', 'payment_status'),
+        Index('idx_order_user_payment', 'user_id', 'payment_status'),
+        Index('idx_order_status_payment_amount', 'status', 'payment_status', 'total_amount'),
+        Index('idx_order_user_created', 'user_id', 'created_at'),
+        Index('idx_order_payment_created_amount', 'payment_status', 'created_at', 'total_amount'),
         Index('idx_order_created', 'created_at'),
         Index('idx_order_deadline', 'deadline'),
     )
@@ -402,3 +406,19 @@ class AdminLog(Base):
     
     def __repr__(self):
         return f"<AdminLog(id={self.id}, action={self.action}, resource={self.resource_type})>"
+
+# -------------------------------------------------
+# Order Counter Model (order number allocation)
+# -------------------------------------------------
+
+class OrderCounter(Base):
+    """
+    Per-day counter backing order numbers (SS<YYYYMMDD><NNNN>)
+    """
+    __tablename__ = "order_counters"
+    
+    day = Column(String(8), primary_key=True)  # YYYYMMDD
+    value = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<OrderCounter(day={self.day}, value={self.value})>"
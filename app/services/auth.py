@@ -6,7 +6,6 @@ Basic admin authentication with session management
 
 import hashlib
 import secrets
-import time
 import logging
 import sys
 from pathlib import Path
@@ -34,8 +33,6 @@ class AuthService:
     
     def __init__(self):
         self.sessions = {}  # In production, use Redis
-        self.session_cleanup_interval = 3600  # 1 hour
-        self.last_cleanup = time.time()
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """
@@ -88,7 +85,7 @@ class AuthService:
         
         # Check expiration
         if datetime.utcnow() > session_data['expires_at']:
-            del self.sessions[session_id]
+            self.sessions.pop(session_id, None)
             return None
         
         # Update last activity
@@ -106,24 +103,17 @@ class AuthService:
     
     def cleanup_expired_sessions(self):
         """
-        Clean up expired sessions periodically
+        Remove expired sessions; scheduled by the API's background sweeper
         """
-        current_time = time.time()
-        
-        # Only cleanup every hour
-        if current_time - self.last_cleanup < self.session_cleanup_interval:
-            return
-        
         current_datetime = datetime.utcnow()
+        # Snapshot the items: sync routes may add or remove sessions from other threads
         expired_sessions = [
-            session_id for session_id, data in self.sessions.items()
+            session_id for session_id, data in list(self.sessions.items())
             if current_datetime > data['expires_at']
         ]
         
         for session_id in expired_sessions:
-            del self.sessions[session_id]
-        
-        self.last_cleanup = current_time
+            self.sessions.pop(session_id, None)
         
         if expired_sessions:
             logger.info(f"Cleaned up {len(expired_sessions)} expired sessions")
@@ -24,6 +24,7 @@ class Settings(BaseSettings):
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    cors_origins: str = ""  # Comma-separated; defaults to app_url
     secret_key: str = "your-secret-key-change-this-in-production"
     algorithm: str = "HS256"
     
@@ -34,6 +35,7 @@ class Settings(BaseSettings):
     # Telegram Bot Configuration
     telegram_bot_token: str = ""
     telegram_admin_id: str = ""
+    telegram_max_concurrent_updates: int = 30
     
     # Payment Configuration - Stripe
     stripe_public_key: str = ""
@@ -149,10 +151,10 @@ class Settings(BaseSettings):
         return {
             "url": self.database_url,
             "echo": self.debug,
-            "pool_size": 10,
-            "max_overflow": 20,
+            "pool_size": 20,
+            "max_overflow": 10,
             "pool_pre_ping": True,
-            "pool_recycle": 3600
+            "pool_recycle": 1800
         }
     
     def get_redis_config(self):